@@ -1,3 +1,42 @@
 # __init__.py
 
-from image_colorizer.model import Colorizer
\ No newline at end of file
+import importlib
+
+__all__ = [
+    "Colorizer",
+    "preload",
+    "warmup"
+]
+
+_LAZY = {
+    "Colorizer": "image_colorizer.model",
+    "preload": "image_colorizer.model",
+    "warmup": "image_colorizer.model"
+}
+
+def __getattr__(name: str):
+    """
+    Imports the heavy modules of the package only when they are first used.
+
+    :param name: The name of the attribute.
+
+    :returns: The attribute value.
+    """
+
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name]), name)
+
+        globals()[name] = value
+
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__() -> list[str]:
+    """
+    Returns the names of the package attributes.
+
+    :returns: The attribute names.
+    """
+
+    return sorted(set(globals()) | set(__all__))
@@ -1,8 +1,7 @@
 # main.py
 
 import argparse
-
-from image_colorizer import Colorizer
+import sys
 
 __all__ = [
     "main"
@@ -27,6 +26,14 @@ def main() -> None:
         '--display_colorized_img', help="display the colorized image",
         action='store_true', default=False
     )
+    parser.add_argument(
+        '--progressive', help="display a fast preview before the colorized image",
+        action='store_true', default=False
+    )
+    parser.add_argument(
+        '--policy', help="what to do with images that are already colored",
+        choices=("force", "skip", "passthrough"), default="force"
+    )
     parser.add_argument(
         '--save_org_img', help="save the original image in a file",
         type=str, default=False
@@ -35,18 +42,99 @@ def main() -> None:
         '--save_colorized_img', help="save the colorized image in a file",
         type=str, default=False
     )
+    parser.add_argument(
+        '--save_chroma_layer', help="save the predicted chroma layer in a file",
+        type=str, default=False
+    )
+    parser.add_argument(
+        '--memory_budget', help="the memory budget of colorization (e.g. 2G)",
+        type=str, default=None
+    )
+    parser.add_argument(
+        '--startup_report', help="measure and print the cold start time to the standard error",
+        action='store_true', default=False
+    )
+    parser.add_argument(
+        '--pipe', help="colorize a stream of images from stdin into stdout",
+        action='store_true', default=False
+    )
+    parser.add_argument(
+        '--width', help="the width of raw frames in pipe mode",
+        type=int, default=None
+    )
+    parser.add_argument(
+        '--height', help="the height of raw frames in pipe mode",
+        type=int, default=None
+    )
+    parser.add_argument(
+        '--pix_fmt', help="the pixel format of raw frames in pipe mode",
+        choices=("gray", "bgr24"), default="gray"
+    )
+    parser.add_argument(
+        '--encode', help="the output encoding extension in pipe mode (e.g. .png)",
+        type=str, default=None
+    )
+    parser.add_argument(
+        '--batch', help="the amount of frames to colorize together in pipe mode",
+        type=int, default=1
+    )
+    parser.add_argument(
+        '--buffer', help="the amount of frames to read ahead in pipe mode",
+        type=int, default=8
+    )
 
     args = parser.parse_args()
 
-    colorizer = Colorizer(args.image)
+    if (args.width is None) != (args.height is None):
+        parser.error("--width and --height must be given together")
+    # end if
+
+    if args.startup_report:
+        from image_colorizer.startup import measure_startup
+
+        print(measure_startup(), file=sys.stderr)
+    # end if
+
+    governor = None
+
+    if args.memory_budget:
+        from image_colorizer.memory import MemoryGovernor
 
-    colorizer.colorize_image()
+        governor = MemoryGovernor(args.memory_budget)
+    # end if
+
+    if args.pipe:
+        from image_colorizer.stream import pipe
+
+        pipe(
+            sys.stdin.buffer, sys.stdout.buffer,
+            width=args.width, height=args.height,
+            pixel_format=args.pix_fmt, extension=args.encode,
+            batch=args.batch, buffer=args.buffer, policy=args.policy,
+            governor=governor
+        )
+
+        return
+    # end if
+
+    from image_colorizer import Colorizer
+
+    colorizer = Colorizer(args.image, policy=args.policy)
+
+    if governor is not None and colorizer.bw_image is not None:
+        if governor.plan(*colorizer.bw_image.shape[:2])[1]:
+            colorizer.colorize_striped()
+        # end if
+    # end if
 
     if args.display_org_img:
         colorizer.display_original_image()
     # end if
 
-    if args.display_colorized_img:
+    if args.display_colorized_img and args.progressive:
+        colorizer.display_progressive_image()
+
+    elif args.display_colorized_img:
         colorizer.display_colorized_image()
     # end if
 
@@ -57,6 +145,10 @@ def main() -> None:
     if args.save_colorized_img:
         colorizer.save_colorized_image(args.save_colorized_img)
     # end if
+
+    if args.save_chroma_layer:
+        colorizer.save_chroma_layer(args.save_chroma_layer)
+    # end if
 # end main
 
 if __name__ == '__main__':
@@ -0,0 +1,518 @@
+# archive.py
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import queue
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+__all__ = [
+    "KINDS",
+    "encoder",
+    "entry_name",
+    "ShardWriter",
+    "read_index",
+    "read_entry"
+]
+
+KINDS = ("tar", "zip")
+
+_END = object()
+
+def encoder(extension: str = ".png") -> Callable[[Any], bytes]:
+    """
+    Creates a function to encode images with OpenCV.
+
+    :param extension: The extension of the encoding format.
+
+    :returns: The encoding function.
+    """
+
+    def encode(image: Any) -> bytes:
+        import cv2
+
+        success, data = cv2.imencode(extension, image)
+
+        if not success:
+            raise ValueError(f"Unable to encode an image as {extension}.")
+
+        return data.tobytes()
+
+    return encode
+
+def entry_name(path: str) -> str:
+    """
+    Converts a path into a relative entry name, with forward slashes.
+
+    Drives, root directories and parent directory references are removed,
+    so an entry never points outside of the directory it is extracted in.
+
+    :param path: The path of the entry.
+
+    :returns: The name of the entry.
+    """
+
+    parts = [
+        part for part in os.path.splitdrive(path)[1].replace(os.sep, "/").split("/")
+        if part not in ("", ".", "..")
+    ]
+
+    if not parts:
+        raise ValueError(f"Invalid entry name: {path}.")
+
+    return "/".join(parts)
+
+def index_path(shard: str) -> str:
+    """
+    Returns the path of the index file of a shard.
+
+    :param shard: The path to the shard.
+
+    :returns: The path to the index file.
+    """
+
+    return f"{shard}.index.jsonl"
+
+def sync_directory(directory: str) -> None:
+    """
+    Flushes the entries of a directory to the disk, where it is supported.
+
+    :param directory: The path to the directory.
+    """
+
+    if os.name == "nt":
+        return
+
+    descriptor = os.open(directory, os.O_RDONLY)
+
+    try:
+        os.fsync(descriptor)
+
+    finally:
+        os.close(descriptor)
+
+def read_index(shard: str) -> dict[str, tuple[int, int]]:
+    """
+    Reads the index of a shard.
+
+    :param shard: The path to the shard.
+
+    :returns: The data offset and size of each entry, by its name.
+    """
+
+    entries = {}
+
+    with open(index_path(shard), "r") as file:
+        for line in file:
+            entry = json.loads(line)
+
+            entries[entry["name"]] = (entry["offset"], entry["size"])
+
+    return entries
+
+def read_entry(shard: str, name: str, index: dict[str, tuple[int, int]] = None) -> bytes:
+    """
+    Reads the data of an entry from a shard, with a single seek.
+
+    :param shard: The path to the shard.
+    :param name: The name of the entry.
+    :param index: The index of the shard, read from its index file by default.
+
+    :returns: The data of the entry.
+    """
+
+    if index is None:
+        index = read_index(shard)
+
+    offset, size = index[name]
+
+    with open(shard, "rb") as file:
+        file.seek(offset)
+
+        return file.read(size)
+
+class ShardWriter:
+    """
+    A class to represent a writer of encoded images into rolling archive shards.
+
+    Images are encoded in parallel, and appended in order into tar or
+    uncompressed zip shards, so a large run makes a few big sequential
+    writes instead of a file per image. A new shard starts when the
+    current one would exceed the shard size, and a shard is finished
+    when no image was written for the idle amount of seconds. Each shard
+    has an index file of JSON lines with the data offset and size of
+    every entry.
+
+    The future of an entry is done only after its data and its index
+    line are synced to the disk, so the entries of a shard that was not
+    finished, like after a crash, can still be read with its index.
+
+    >>> from image_colorizer.archive import ShardWriter
+    >>>
+    >>> with ShardWriter("output", kind="tar") as writer:
+    >>>     writer.write("lion.png", Colorizer("lion.jpg").colorize_image())
+    """
+
+    SHARD_SIZE = 1 << 30
+    PREFIX = "shard"
+    IDLE = 30.0
+
+    def __init__(
+            self,
+            directory: str,
+            kind: str = "tar",
+            shard_size: int = None,
+            extension: str = ".png",
+            workers: int = None,
+            pending: int = None,
+            prefix: str = None,
+            encode: Callable[[Any], bytes] = None,
+            idle: float = None
+    ) -> None:
+        """
+        Defines the shards and starts the encoding workers.
+
+        :param directory: The directory to write the shards in.
+        :param kind: The archive format of the shards, tar or zip.
+        :param shard_size: The maximum amount of bytes of a shard.
+        :param extension: The extension of the encoding format.
+        :param workers: The amount of encoding threads.
+        :param pending: The maximum amount of images waiting to be appended.
+        :param prefix: The prefix of the shard file names.
+        :param encode: The function to encode an image into bytes.
+        :param idle: The amount of seconds without images to finish the current shard, 0 for never.
+        """
+
+        if kind not in KINDS:
+            raise ValueError(
+                f"Invalid archive kind: {kind}. Valid kinds are: {', '.join(KINDS)}."
+            )
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.kind = kind
+        self.shard_size = shard_size or self.SHARD_SIZE
+        self.prefix = prefix or self.PREFIX
+        self.extension = extension
+        self.encode = encode or encoder(extension)
+        self.idle = self.IDLE if idle is None else idle
+        self.shards: list[str] = []
+
+        self._number = 0
+
+        workers = workers or os.cpu_count() or 1
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._queue = queue.Queue(maxsize=pending or 4 * workers)
+        self._closed = False
+        self._archive = None
+        self._file = None
+        self._index = None
+        self._lines = []
+        self._size = 0
+        self._error = None
+
+        self._appender = threading.Thread(target=self._append_all, daemon=True)
+        self._appender.start()
+
+    def __enter__(self) -> ShardWriter:
+        """
+        Enters the context of the writer.
+
+        :returns: The writer object.
+        """
+
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Closes the writer when the context ends."""
+
+        self.close()
+
+    def write(self, name: str, image: Any) -> Future:
+        """
+        Encodes the image in the background, and appends it to the current shard.
+
+        The call waits while too many images are waiting to be appended.
+
+        :param name: The path of the entry in the shard, stored as a relative name.
+        :param image: The image object to write.
+
+        :returns: The future of the entry name, done once the entry is appended.
+        """
+
+        self._check()
+
+        name = entry_name(name)
+        appended = Future()
+
+        self._queue.put((name, self._executor.submit(self.encode, image), appended))
+
+        return appended
+
+    def write_bytes(self, name: str, data: bytes) -> Future:
+        """
+        Appends already encoded data to the current shard.
+
+        :param name: The path of the entry in the shard, stored as a relative name.
+        :param data: The encoded data.
+
+        :returns: The future of the entry name, done once the entry is appended.
+        """
+
+        self._check()
+
+        name = entry_name(name)
+
+        encoded = Future()
+        encoded.set_result(data)
+
+        appended = Future()
+
+        self._queue.put((name, encoded, appended))
+
+        return appended
+
+    def _check(self) -> None:
+        """Checks that the writer can still accept images."""
+
+        if self._closed:
+            raise ValueError("The shard writer is closed.")
+
+        if self._error is not None:
+            raise self._error
+
+    def _append_all(self) -> None:
+        """
+        Appends the encoded images in the order they were written.
+
+        The images that are ready together are synced to the disk together,
+        before their futures are done. An image that fails to encode only
+        fails its own future, while a failure to write a shard stops the writer.
+        """
+
+        done = False
+
+        while not done:
+            try:
+                item = self._queue.get(timeout=self.idle or None)
+
+            except queue.Empty:
+                self._finish(self._close)
+
+                continue
+
+            items = [item]
+
+            while items[-1] is not _END:
+                try:
+                    items.append(self._queue.get_nowait())
+
+                except queue.Empty:
+                    break
+
+            appended = []
+
+            for item in items:
+                if item is _END:
+                    done = True
+
+                    continue
+
+                name, encoded, future = item
+
+                if (error := encoded.exception()) is not None:
+                    future.set_exception(error)
+
+                    continue
+
+                try:
+                    self._append(name, encoded.result())
+
+                except Exception as error:
+                    self._error = self._error or error
+
+                    future.set_exception(error)
+
+                else:
+                    appended.append((name, future))
+
+            error = self._finish(self._sync)
+
+            for name, future in appended:
+                if error is None:
+                    future.set_result(name)
+
+                else:
+                    future.set_exception(error)
+
+    def _finish(self, action: Callable[[], None]) -> Exception | None:
+        """
+        Runs an action on the current shard, recording its failure.
+
+        :param action: The action to run.
+
+        :returns: The error of the action, if it failed.
+        """
+
+        try:
+            action()
+
+        except Exception as error:
+            self._error = self._error or error
+
+            return error
+
+        return None
+
+    def _open(self) -> None:
+        """
+        Starts a new shard, with the next free shard number.
+
+        Shards and their index files are created exclusively, so an existing
+        shard, like one of an earlier writer with the same prefix, is never
+        truncated, and its number is skipped.
+        """
+
+        while True:
+            path = os.path.join(
+                self.directory, f"{self.prefix}-{self._number:05d}.{self.kind}"
+            )
+
+            self._number += 1
+
+            try:
+                file = open(path, "xb")
+
+            except FileExistsError:
+                continue
+
+            try:
+                index = open(index_path(path), "x")
+
+            except BaseException as error:
+                file.close()
+                os.remove(path)
+
+                if isinstance(error, FileExistsError):
+                    continue
+
+                raise
+
+            break
+
+        if self.kind == "tar":
+            archive = tarfile.open(fileobj=file, mode="w")
+
+        else:
+            archive = zipfile.ZipFile(file, "w", compression=zipfile.ZIP_STORED)
+
+        sync_directory(self.directory)
+
+        self._file = file
+        self._index = index
+        self._archive = archive
+        self._size = 0
+
+        self.shards.append(path)
+
+    def _sync(self) -> None:
+        """Writes the appended entries of the current shard and their index to the disk."""
+
+        if self._archive is None:
+            return
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self._index.write("".join(self._lines))
+        self._index.flush()
+        os.fsync(self._index.fileno())
+
+        self._lines = []
+
+    def _close(self) -> None:
+        """Finishes the current shard."""
+
+        if self._archive is None:
+            return
+
+        self._archive.close()
+        self._sync()
+
+        self._file.close()
+        self._index.close()
+
+        self._archive = None
+        self._file = None
+        self._index = None
+
+    def _append(self, name: str, data: bytes) -> None:
+        """
+        Appends an entry to the current shard, starting a new one when it is full.
+
+        The index line of the entry is written when the shard is synced,
+        so the index never points to data that is not on the disk.
+
+        :param name: The name of the entry.
+        :param data: The encoded data.
+        """
+
+        if (
+            (self._archive is not None) and self._size and
+            (self._size + len(data) + tarfile.BLOCKSIZE > self.shard_size)
+        ):
+            self._close()
+
+        if self._archive is None:
+            self._open()
+
+        if self.kind == "tar":
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+
+            self._archive.addfile(info, io.BytesIO(data))
+
+            self._size = self._archive.offset
+
+            blocks = -(-len(data) // tarfile.BLOCKSIZE)
+            offset = self._size - blocks * tarfile.BLOCKSIZE
+
+        else:
+            self._archive.writestr(
+                zipfile.ZipInfo(name, time.localtime()[:6]), data
+            )
+
+            self._size = self._archive.start_dir
+
+            offset = self._size - len(data)
+
+        self._lines.append(
+            json.dumps(dict(name=name, offset=offset, size=len(data))) + "\n"
+        )
+
+    def close(self) -> None:
+        """Waits for the written images, and finishes the last shard."""
+
+        if self._closed:
+            return
+
+        self._closed = True
+
+        self._queue.put(_END)
+        self._appender.join()
+        self._executor.shutdown()
+
+        self._close()
+
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,135 @@
+# chroma.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+__all__ = [
+    "MODEL_VERSION",
+    "INTERPOLATIONS",
+    "ChromaLayer",
+    "image_hash",
+    "save_chroma",
+    "load_chroma",
+    "render"
+]
+
+MODEL_VERSION = "colorization_release_v2"
+
+INTERPOLATIONS = {
+    "nearest": cv2.INTER_NEAREST,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+    "area": cv2.INTER_AREA,
+    "lanczos": cv2.INTER_LANCZOS4
+}
+
+def image_hash(image: np.array) -> str:
+    """
+    Hashes the pixels of an image.
+
+    :param image: The image object to hash.
+
+    :returns: The hexadecimal sha256 digest.
+    """
+
+    digest = hashlib.sha256(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).tobytes())
+
+    return digest.hexdigest()
+
+@dataclass(slots=True)
+class ChromaLayer:
+    """
+    A class to represent the ab channels predicted by the network.
+
+    The layer holds only the low resolution network output, which is
+    recombined with the light channel of the original image on render.
+    """
+
+    ab: np.array
+    source: str
+    model: str = MODEL_VERSION
+    interpolation: str = "linear"
+    metadata: dict = field(default_factory=dict)
+
+def save_chroma(layer: ChromaLayer, path: str) -> None:
+    """
+    Saves the chroma layer into a compressed file.
+
+    :param layer: The chroma layer to save.
+    :param path: The file path to save the layer in.
+    """
+
+    if location := os.path.split(path)[0]:
+        os.makedirs(location, exist_ok=True)
+
+    metadata = dict(
+        model=layer.model, source=layer.source,
+        interpolation=layer.interpolation, metadata=layer.metadata
+    )
+
+    with open(path, "wb") as file:
+        np.savez_compressed(
+            file, ab=layer.ab.astype(np.float16),
+            metadata=np.array(json.dumps(metadata))
+        )
+
+def load_chroma(path: str) -> ChromaLayer:
+    """
+    Loads the chroma layer from a file.
+
+    :param path: The file path of the layer.
+
+    :returns: The chroma layer object.
+    """
+
+    with np.load(path, allow_pickle=False) as data:
+        ab = data["ab"].astype(np.float32)
+        metadata = json.loads(str(data["metadata"]))
+
+    return ChromaLayer(ab=ab, **metadata)
+
+def render(
+        layer: ChromaLayer,
+        image: np.array,
+        size: tuple[int, int] = None,
+        verify: bool = False
+) -> np.array:
+    """
+    Recombines the chroma layer with the light channel of the original image.
+
+    :param layer: The chroma layer to render.
+    :param image: The original BGR image object.
+    :param size: The (width, height) of the output image.
+    :param verify: The value to check the image against the layer source hash.
+
+    :returns: The colorized image object.
+    """
+
+    if verify and image_hash(image) != layer.source:
+        raise ValueError("The image does not match the source of the chroma layer.")
+
+    interpolation = INTERPOLATIONS[layer.interpolation]
+
+    if size is not None and size != (image.shape[1], image.shape[0]):
+        image = cv2.resize(image, size, interpolation=interpolation)
+
+    normalized_img = image.astype("float32") / 255.0
+    light_img = cv2.cvtColor(normalized_img, cv2.COLOR_BGR2LAB)[:, :, 0]
+
+    ab = cv2.resize(
+        layer.ab, (image.shape[1], image.shape[0]),
+        interpolation=interpolation
+    )
+
+    colorized_img = np.concatenate((light_img[:, :, np.newaxis], ab), axis=2)
+    colorized_img = cv2.cvtColor(colorized_img, cv2.COLOR_LAB2BGR)
+
+    return (255 * colorized_img).astype("uint8")
@@ -0,0 +1,1095 @@
+# jobs.py
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from functools import partial
+from typing import Callable, Iterable
+
+from image_colorizer.archive import KINDS, ShardWriter
+from image_colorizer.memory import MemoryGovernor, parse_size, read_image_size
+
+__all__ = [
+    "Task",
+    "QueueBackend",
+    "SQLiteQueue",
+    "SpoolQueue",
+    "open_queue",
+    "destinations",
+    "colorize",
+    "Worker",
+    "main"
+]
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+STATUSES = (PENDING, LEASED, DONE, FAILED)
+
+@dataclass(slots=True)
+class Task:
+    """A class to represent a colorization job."""
+
+    id: str
+    source: str
+    destination: str
+    attempts: int = 0
+    error: str | None = None
+
+class QueueBackend(ABC):
+    """
+    A class to represent a shared queue of colorization jobs.
+
+    Workers lease tasks for a limited time and renew the lease with heartbeats.
+    A lease that is not renewed in time belongs to a dead worker, and its task
+    is returned to the queue, or marked as failed after the maximum attempts.
+    A task that failed is only leased again after the retry delay, which
+    doubles with each attempt, so transient errors do not use up its attempts.
+    """
+
+    MAX_ATTEMPTS = 3
+    RETRY_DELAY = 5.0
+
+    def __init__(self, max_attempts: int = None, retry_delay: float = None) -> None:
+        """
+        Defines the retry policy of the queue.
+
+        :param max_attempts: The amount of failed attempts before a task fails.
+        :param retry_delay: The amount of seconds before the first retry of a failed task.
+        """
+
+        self.max_attempts = max_attempts or self.MAX_ATTEMPTS
+        self.retry_delay = self.RETRY_DELAY if retry_delay is None else retry_delay
+
+    @abstractmethod
+    def put(self, source: str, destination: str) -> Task:
+        """
+        Adds a task to the queue.
+
+        :param source: The path of the image to colorize.
+        :param destination: The path to save the colorized image in.
+
+        :returns: The task object.
+        """
+
+    @abstractmethod
+    def lease(self, worker: str, ttl: float) -> Task | None:
+        """
+        Takes a pending task from the queue.
+
+        :param worker: The name of the worker.
+        :param ttl: The amount of seconds the lease is valid for.
+
+        :returns: The task object, or None when no task is pending.
+        """
+
+    @abstractmethod
+    def heartbeat(self, task: Task, worker: str, ttl: float) -> bool:
+        """
+        Renews the lease of a task.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+        :param ttl: The amount of seconds the lease is valid for.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+    @abstractmethod
+    def complete(self, task: Task, worker: str) -> bool:
+        """
+        Marks a leased task as done.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+    @abstractmethod
+    def fail(self, task: Task, worker: str, error: str) -> bool:
+        """
+        Returns a leased task to the queue, or marks it as failed.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+        :param error: The description of the failure.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+    @abstractmethod
+    def requeue_expired(self) -> int:
+        """
+        Returns the tasks of expired leases to the queue.
+
+        :returns: The amount of expired leases.
+        """
+
+    @abstractmethod
+    def counts(self) -> dict[str, int]:
+        """
+        Counts the tasks by their status.
+
+        :returns: The amount of tasks of each status.
+        """
+
+    @abstractmethod
+    def tasks(self, status: str) -> list[Task]:
+        """
+        Collects the tasks of a status.
+
+        :param status: The status of the tasks.
+
+        :returns: The task objects.
+        """
+
+    def put_many(self, jobs: Iterable[tuple[str, str]]) -> list[Task]:
+        """
+        Adds several tasks to the queue.
+
+        :param jobs: The source and destination paths of the tasks.
+
+        :returns: The task objects.
+        """
+
+        return [self.put(source, destination) for source, destination in jobs]
+
+    def next_status(self, attempts: int) -> str:
+        """
+        Returns the status of a task after a failed attempt.
+
+        :param attempts: The amount of failed attempts of the task.
+
+        :returns: The status of the task.
+        """
+
+        return FAILED if attempts >= self.max_attempts else PENDING
+
+    def retry_time(self, attempts: int) -> float:
+        """
+        Returns the time from which a failed task can be leased again.
+
+        :param attempts: The amount of failed attempts of the task.
+
+        :returns: The time of the retry.
+        """
+
+        return time.time() + self.retry_delay * 2 ** (attempts - 1)
+
+class SQLiteQueue(QueueBackend):
+    """
+    A class to represent a queue of colorization jobs in an SQLite database.
+
+    The database file can be shared by worker processes on the same host,
+    or by several hosts through a file system with working locks.
+    """
+
+    def __init__(
+            self, path: str, max_attempts: int = None, retry_delay: float = None
+    ) -> None:
+        """
+        Connects to the database, and creates the tasks table.
+
+        The expiration time of a pending task is the time of its next retry.
+
+        :param path: The path to the database file.
+        :param max_attempts: The amount of failed attempts before a task fails.
+        :param retry_delay: The amount of seconds before the first retry of a failed task.
+        """
+
+        super().__init__(max_attempts=max_attempts, retry_delay=retry_delay)
+
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id TEXT PRIMARY KEY, source TEXT, destination TEXT, "
+            "status TEXT, worker TEXT, expires REAL, "
+            "attempts INTEGER DEFAULT 0, error TEXT, created REAL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, created)"
+        )
+
+    def _transaction(self, statements: Callable[[sqlite3.Connection], object]) -> object:
+        """
+        Runs the statements in a write transaction.
+
+        :param statements: The function to run with the connection.
+
+        :returns: The return value of the function.
+        """
+
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                result = statements(self._connection)
+
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+
+                raise
+
+            self._connection.execute("COMMIT")
+
+            return result
+
+    def _expire(self, connection: sqlite3.Connection) -> int:
+        """
+        Returns the tasks of expired leases to the queue, inside a transaction.
+
+        :param connection: The database connection.
+
+        :returns: The amount of expired leases.
+        """
+
+        rows = connection.execute(
+            "SELECT id, attempts FROM tasks WHERE status = ? AND expires < ?",
+            (LEASED, time.time())
+        ).fetchall()
+
+        for task_id, attempts in rows:
+            connection.execute(
+                "UPDATE tasks SET status = ?, worker = NULL, expires = NULL, "
+                "attempts = ?, error = ? WHERE id = ?",
+                (
+                    self.next_status(attempts + 1), attempts + 1,
+                    "lease expired", task_id
+                )
+            )
+
+        return len(rows)
+
+    def put(self, source: str, destination: str) -> Task:
+        """
+        Adds a task to the queue.
+
+        :param source: The path of the image to colorize.
+        :param destination: The path to save the colorized image in.
+
+        :returns: The task object.
+        """
+
+        task = Task(id=uuid.uuid4().hex, source=source, destination=destination)
+
+        self._transaction(
+            lambda connection: connection.execute(
+                "INSERT INTO tasks (id, source, destination, status, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (task.id, task.source, task.destination, PENDING, time.time())
+            )
+        )
+
+        return task
+
+    def lease(self, worker: str, ttl: float) -> Task | None:
+        """
+        Takes a pending task from the queue.
+
+        :param worker: The name of the worker.
+        :param ttl: The amount of seconds the lease is valid for.
+
+        :returns: The task object, or None when no task is pending.
+        """
+
+        def statements(connection: sqlite3.Connection) -> Task | None:
+            self._expire(connection)
+
+            row = connection.execute(
+                "SELECT id, source, destination, attempts, error FROM tasks "
+                "WHERE status = ? AND (expires IS NULL OR expires <= ?) "
+                "ORDER BY created LIMIT 1",
+                (PENDING, time.time())
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            connection.execute(
+                "UPDATE tasks SET status = ?, worker = ?, expires = ? WHERE id = ?",
+                (LEASED, worker, time.time() + ttl, row[0])
+            )
+
+            return Task(*row)
+
+        return self._transaction(statements)
+
+    def _update(self, task: Task, worker: str, status: str, values: dict) -> bool:
+        """
+        Updates a task leased by the worker.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+        :param status: The new status of the task.
+        :param values: The new values of the other columns.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+        columns = "".join(f", {name} = ?" for name in values)
+
+        return self._transaction(
+            lambda connection: connection.execute(
+                f"UPDATE tasks SET status = ?{columns} "
+                "WHERE id = ? AND status = ? AND worker = ?",
+                (status, *values.values(), task.id, LEASED, worker)
+            ).rowcount == 1
+        )
+
+    def heartbeat(self, task: Task, worker: str, ttl: float) -> bool:
+        """
+        Renews the lease of a task.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+        :param ttl: The amount of seconds the lease is valid for.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+        return self._update(task, worker, LEASED, dict(expires=time.time() + ttl))
+
+    def complete(self, task: Task, worker: str) -> bool:
+        """
+        Marks a leased task as done.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+        return self._update(task, worker, DONE, dict(expires=None, error=None))
+
+    def fail(self, task: Task, worker: str, error: str) -> bool:
+        """
+        Returns a leased task to the queue, or marks it as failed.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+        :param error: The description of the failure.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+        attempts = task.attempts + 1
+
+        return self._update(
+            task, worker, self.next_status(attempts),
+            dict(
+                worker=None, expires=self.retry_time(attempts),
+                attempts=attempts, error=error
+            )
+        )
+
+    def requeue_expired(self) -> int:
+        """
+        Returns the tasks of expired leases to the queue.
+
+        :returns: The amount of expired leases.
+        """
+
+        return self._transaction(self._expire)
+
+    def counts(self) -> dict[str, int]:
+        """
+        Counts the tasks by their status.
+
+        :returns: The amount of tasks of each status.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+            ).fetchall()
+
+        return {status: 0 for status in STATUSES} | dict(rows)
+
+    def tasks(self, status: str) -> list[Task]:
+        """
+        Collects the tasks of a status.
+
+        :param status: The status of the tasks.
+
+        :returns: The task objects.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, source, destination, attempts, error FROM tasks "
+                "WHERE status = ? ORDER BY created",
+                (status,)
+            ).fetchall()
+
+        return [Task(*row) for row in rows]
+
+class SpoolQueue(QueueBackend):
+    """
+    A class to represent a queue of colorization jobs in a shared directory.
+
+    Each task is a JSON file, moved between the status directories with
+    atomic renames. A leased file is named after its worker, and its
+    modification time holds the expiration time of the lease. The
+    modification time of a pending file holds the time of its next retry.
+    """
+
+    def __init__(
+            self, directory: str, max_attempts: int = None, retry_delay: float = None
+    ) -> None:
+        """
+        Creates the status directories of the spool.
+
+        :param directory: The path to the spool directory.
+        :param max_attempts: The amount of failed attempts before a task fails.
+        :param retry_delay: The amount of seconds before the first retry of a failed task.
+        """
+
+        super().__init__(max_attempts=max_attempts, retry_delay=retry_delay)
+
+        self.directory = directory
+
+        for status in (*STATUSES, "claimed"):
+            os.makedirs(os.path.join(directory, status), exist_ok=True)
+
+    def _path(self, status: str, name: str) -> str:
+        """
+        Returns the path of a task file.
+
+        :param status: The status directory of the file.
+        :param name: The name of the file.
+
+        :returns: The path to the file.
+        """
+
+        return os.path.join(self.directory, status, name)
+
+    def _leased(self, task: Task, worker: str) -> str:
+        """
+        Returns the path of a task file leased by the worker.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+
+        :returns: The path to the file.
+        """
+
+        return self._path(LEASED, f"{task.id}@{worker}.json")
+
+    @staticmethod
+    def _read(path: str) -> Task:
+        """
+        Reads a task file.
+
+        :param path: The path to the file.
+
+        :returns: The task object.
+        """
+
+        with open(path, "r") as file:
+            return Task(**json.load(file))
+
+    @staticmethod
+    def _write(path: str, task: Task) -> None:
+        """
+        Writes a task file atomically.
+
+        :param path: The path to the file.
+        :param task: The task object.
+        """
+
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+
+        with open(temporary, "w") as file:
+            json.dump(asdict(task), file)
+
+        os.replace(temporary, path)
+
+    def _retry(self, path: str, task: Task, error: str, delay: bool = True) -> None:
+        """
+        Moves a claimed task file back to the queue, or to the failed tasks.
+
+        :param path: The path to the claimed file.
+        :param task: The task object.
+        :param error: The description of the failure.
+        :param delay: The value to wait for the retry delay before the next lease.
+        """
+
+        task.attempts += 1
+        task.error = error
+
+        self._write(path, task)
+
+        if delay:
+            retry = self.retry_time(task.attempts)
+
+            os.utime(path, (retry, retry))
+
+        os.rename(
+            path, self._path(self.next_status(task.attempts), f"{task.id}.json")
+        )
+
+    def put(self, source: str, destination: str) -> Task:
+        """
+        Adds a task to the queue.
+
+        :param source: The path of the image to colorize.
+        :param destination: The path to save the colorized image in.
+
+        :returns: The task object.
+        """
+
+        task = Task(
+            id=f"{time.time_ns():020d}-{uuid.uuid4().hex}",
+            source=source, destination=destination
+        )
+
+        self._write(self._path(PENDING, f"{task.id}.json"), task)
+
+        return task
+
+    def lease(self, worker: str, ttl: float) -> Task | None:
+        """
+        Takes a pending task from the queue.
+
+        :param worker: The name of the worker.
+        :param ttl: The amount of seconds the lease is valid for.
+
+        :returns: The task object, or None when no task is pending.
+        """
+
+        self.requeue_expired()
+
+        now = time.time()
+
+        for name in sorted(os.listdir(os.path.join(self.directory, PENDING))):
+            if not name.endswith(".json"):
+                continue
+
+            path = self._path(PENDING, name)
+            leased = self._path(LEASED, f"{name[:-len('.json')]}@{worker}.json")
+            expires = now + ttl
+
+            try:
+                if os.path.getmtime(path) > now:
+                    continue
+
+                os.utime(path, (expires, expires))
+                os.rename(path, leased)
+
+            except FileNotFoundError:
+                continue
+
+            return self._read(leased)
+
+        return None
+
+    def heartbeat(self, task: Task, worker: str, ttl: float) -> bool:
+        """
+        Renews the lease of a task.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+        :param ttl: The amount of seconds the lease is valid for.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+        expires = time.time() + ttl
+
+        try:
+            os.utime(self._leased(task, worker), (expires, expires))
+
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def _claim(self, task: Task, worker: str) -> str | None:
+        """
+        Takes a leased task file away from the leased tasks.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+
+        :returns: The path to the claimed file, or None when the lease was lost.
+        """
+
+        claimed = self._path("claimed", f"{task.id}.json")
+
+        try:
+            os.rename(self._leased(task, worker), claimed)
+
+        except FileNotFoundError:
+            return None
+
+        return claimed
+
+    def complete(self, task: Task, worker: str) -> bool:
+        """
+        Marks a leased task as done.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+        if (claimed := self._claim(task, worker)) is None:
+            return False
+
+        os.rename(claimed, self._path(DONE, f"{task.id}.json"))
+
+        return True
+
+    def fail(self, task: Task, worker: str, error: str) -> bool:
+        """
+        Returns a leased task to the queue, or marks it as failed.
+
+        :param task: The leased task.
+        :param worker: The name of the worker.
+        :param error: The description of the failure.
+
+        :returns: The value of the worker still holding the lease.
+        """
+
+        if (claimed := self._claim(task, worker)) is None:
+            return False
+
+        self._retry(claimed, self._read(claimed), error)
+
+        return True
+
+    def requeue_expired(self) -> int:
+        """
+        Returns the tasks of expired leases to the queue.
+
+        :returns: The amount of expired leases.
+        """
+
+        count = 0
+        now = time.time()
+
+        for path in glob.glob(self._path(LEASED, "*@*.json")):
+            claimed = self._path(
+                "claimed", os.path.basename(path).split("@")[0] + ".json"
+            )
+
+            try:
+                if os.path.getmtime(path) >= now:
+                    continue
+
+                os.rename(path, claimed)
+
+            except FileNotFoundError:
+                continue
+
+            self._retry(claimed, self._read(claimed), "lease expired", delay=False)
+
+            count += 1
+
+        return count
+
+    def counts(self) -> dict[str, int]:
+        """
+        Counts the tasks by their status.
+
+        :returns: The amount of tasks of each status.
+        """
+
+        return {
+            status: len(glob.glob(self._path(status, "*.json")))
+            for status in STATUSES
+        }
+
+    def tasks(self, status: str) -> list[Task]:
+        """
+        Collects the tasks of a status.
+
+        :param status: The status of the tasks.
+
+        :returns: The task objects.
+        """
+
+        tasks = []
+
+        for path in sorted(glob.glob(self._path(status, "*.json"))):
+            try:
+                tasks.append(self._read(path))
+
+            except FileNotFoundError:
+                continue
+
+        return tasks
+
+def open_queue(
+        location: str, max_attempts: int = None, retry_delay: float = None
+) -> QueueBackend:
+    """
+    Opens the queue at the location.
+
+    Files ending with .db, .sqlite or .sqlite3 are SQLite queues,
+    and any other location is a spool directory.
+
+    :param location: The path to the queue.
+    :param max_attempts: The amount of failed attempts before a task fails.
+    :param retry_delay: The amount of seconds before the first retry of a failed task.
+
+    :returns: The queue backend object.
+    """
+
+    if os.path.splitext(location)[1] in (".db", ".sqlite", ".sqlite3"):
+        return SQLiteQueue(location, max_attempts=max_attempts, retry_delay=retry_delay)
+
+    return SpoolQueue(location, max_attempts=max_attempts, retry_delay=retry_delay)
+
+def destinations(images: Iterable[str], output: str) -> list[tuple[str, str]]:
+    """
+    Pairs the images with their destinations in the output directory.
+
+    Each destination keeps the path of its image relative to the deepest
+    directory that contains all the images, so images with the same name
+    in different directories do not overwrite each other.
+
+    :param images: The paths of the images to colorize.
+    :param output: The path of the output directory.
+
+    :returns: The source and destination paths of the images.
+    """
+
+    images = list(images)
+
+    if not images:
+        return []
+
+    root = os.path.commonpath(
+        [os.path.dirname(os.path.abspath(image)) for image in images]
+    )
+
+    jobs = [
+        (image, os.path.join(output, os.path.relpath(os.path.abspath(image), root)))
+        for image in images
+    ]
+
+    seen = set()
+
+    for image, destination in jobs:
+        if destination in seen:
+            raise ValueError(f"Duplicate destination of {image}: {destination}.")
+
+        seen.add(destination)
+
+    return jobs
+
+def colorize(
+        task: Task,
+        policy: str = None,
+        governor: MemoryGovernor = None,
+        writer: ShardWriter = None
+) -> None:
+    """
+    Colorizes the source image of the task into its destination.
+
+    With a memory governor, the memory of the task is reserved before
+    the image is loaded, when its size can be read from the file header.
+    With a shard writer, the destination, with the extension of the writer,
+    is the relative name of the entry in the shards, and the task ends once
+    the entry is appended.
+
+    :param task: The task to run.
+    :param policy: The policy for images that are already colored.
+    :param governor: The memory budget shared by the tasks.
+    :param writer: The writer of the archive shards to save the image in.
+    """
+
+    from image_colorizer.model import Colorizer
+
+    def load() -> Colorizer:
+        loaded = Colorizer(task.source, policy=policy)
+
+        if loaded.bw_image is None:
+            raise ValueError(f"Unable to read an image from {task.source}.")
+
+        return loaded
+
+    def save(saved: Colorizer) -> None:
+        if writer is None:
+            saved.save_colorized_image(task.destination)
+
+        elif (image := saved.configure_colorized_image()) is not None:
+            name = os.path.splitext(task.destination)[0] + writer.extension
+
+            writer.write(name, image).result()
+
+    if governor is None:
+        save(load())
+
+        return
+
+    colorizer = None
+
+    if (size := read_image_size(task.source)) is None:
+        colorizer = load()
+        size = colorizer.bw_image.shape[:2]
+
+    with governor.reserve(*governor.plan(*size)) as low_memory:
+        colorizer = colorizer or load()
+
+        if low_memory:
+            colorizer.colorize_striped()
+
+        save(colorizer)
+
+class Worker:
+    """
+    A class to represent a worker that runs the tasks of a queue.
+
+    Any amount of workers, in any amount of processes or hosts,
+    can run the tasks of the same queue.
+
+    >>> from image_colorizer.jobs import Worker, open_queue
+    >>>
+    >>> queue = open_queue("jobs.sqlite")
+    >>> queue.put("<PATH TO B&W IMAGE>", "<PATH TO COLORIZED IMAGE>")
+    >>> Worker(queue).run()
+    """
+
+    TTL = 60.0
+    POLL = 1.0
+
+    def __init__(
+            self,
+            backend: QueueBackend,
+            handler: Callable[[Task], None] = None,
+            name: str = None,
+            ttl: float = None,
+            poll: float = None
+    ) -> None:
+        """
+        Defines the worker of the queue.
+
+        :param backend: The queue to take tasks from.
+        :param handler: The function to run each task with.
+        :param name: The unique name of the worker.
+        :param ttl: The amount of seconds a lease is valid for without a heartbeat.
+        :param poll: The amount of seconds to wait for tasks of other workers.
+        """
+
+        self.backend = backend
+        self.handler = handler or colorize
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.ttl = ttl or self.TTL
+        self.poll = poll or self.POLL
+
+    def _beat(self, task: Task, stop: threading.Event) -> None:
+        """
+        Renews the lease of the task until the stop event is set.
+
+        :param task: The leased task.
+        :param stop: The event to stop the heartbeats.
+        """
+
+        while not stop.wait(self.ttl / 3):
+            if not self.backend.heartbeat(task, self.name, self.ttl):
+                return
+
+    def process(self, task: Task) -> bool:
+        """
+        Runs the task while renewing its lease.
+
+        :param task: The leased task.
+
+        :returns: The value of the task being completed.
+        """
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._beat, args=(task, stop), daemon=True)
+        heartbeat.start()
+
+        try:
+            self.handler(task)
+
+        except Exception as error:
+            self.backend.fail(task, self.name, f"{type(error).__name__}: {error}")
+
+            return False
+
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        return self.backend.complete(task, self.name)
+
+    def run(self, wait: bool = False, limit: int = None) -> int:
+        """
+        Runs tasks from the queue.
+
+        Without waiting, the worker stops once no task is pending or leased.
+
+        :param wait: The value to keep waiting for new tasks.
+        :param limit: The maximum amount of tasks to run.
+
+        :returns: The amount of completed tasks.
+        """
+
+        completed = 0
+        count = 0
+
+        while limit is None or count < limit:
+            task = self.backend.lease(self.name, self.ttl)
+
+            if task is None:
+                counts = self.backend.counts()
+
+                if not (wait or counts[PENDING] or counts[LEASED]):
+                    break
+
+                time.sleep(self.poll)
+
+                continue
+
+            count += 1
+            completed += self.process(task)
+
+        return completed
+
+def main() -> None:
+    """Runs the program to submit, run and inspect colorization jobs."""
+
+    parser = argparse.ArgumentParser(
+        description='A distributed queue of image colorization jobs.'
+    )
+
+    parser.add_argument(
+        'queue', metavar='QUEUE',
+        help="SQLite database file (.db, .sqlite) or spool directory"
+    )
+    parser.add_argument(
+        '--retry_delay', help="the seconds before the first retry of a failed task",
+        type=float, default=None
+    )
+
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit', help="add images to the queue")
+    submit.add_argument('images', metavar='IMAGE_FILE', nargs='+')
+    submit.add_argument(
+        '--output', help="the directory to save the colorized images in",
+        type=str, default="colorized"
+    )
+
+    work = commands.add_parser('work', help="run tasks from the queue")
+    work.add_argument(
+        '--wait', help="keep waiting for new tasks",
+        action='store_true', default=False
+    )
+    work.add_argument(
+        '--ttl', help="the amount of seconds a lease is valid for",
+        type=float, default=Worker.TTL
+    )
+    work.add_argument(
+        '--policy', help="what to do with images that are already colored",
+        choices=("force", "skip", "passthrough"), default="force"
+    )
+    work.add_argument(
+        '--threads', help="the amount of workers to run in this process",
+        type=int, default=1
+    )
+    work.add_argument(
+        '--memory_budget', help="the memory budget of the workers (e.g. 4G)",
+        type=str, default=None
+    )
+    work.add_argument(
+        '--archive', help="the directory to write archive shards in, instead of files",
+        type=str, default=None
+    )
+    work.add_argument(
+        '--archive_kind', help="the archive format of the shards",
+        choices=KINDS, default="tar"
+    )
+    work.add_argument(
+        '--shard_size', help="the maximum size of a shard (e.g. 1G)",
+        type=str, default=None
+    )
+
+    commands.add_parser('status', help="count the tasks by their status")
+
+    args = parser.parse_args()
+
+    queue = open_queue(args.queue, retry_delay=args.retry_delay)
+
+    if args.command == 'submit':
+        try:
+            jobs = destinations(args.images, args.output)
+
+        except ValueError as error:
+            parser.error(str(error))
+        # end try
+
+        queue.put_many(jobs)
+
+    elif args.command == 'work':
+        governor = None
+
+        if args.memory_budget:
+            governor = MemoryGovernor(args.memory_budget)
+        # end if
+
+        writer = None
+
+        if args.archive:
+            writer = ShardWriter(
+                args.archive, kind=args.archive_kind,
+                shard_size=args.shard_size and parse_size(args.shard_size),
+                prefix=f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            )
+        # end if
+
+        handler = partial(
+            colorize, policy=args.policy, governor=governor, writer=writer
+        )
+
+        threads = [
+            threading.Thread(
+                target=Worker(queue, handler=handler, ttl=args.ttl).run,
+                kwargs=dict(wait=args.wait)
+            )
+            for _ in range(args.threads)
+        ]
+
+        for thread in threads:
+            thread.start()
+        # end for
+
+        for thread in threads:
+            thread.join()
+        # end for
+
+        if writer is not None:
+            writer.close()
+        # end if
+    # end if
+
+    print(json.dumps(queue.counts()))
+# end main
+
+if __name__ == '__main__':
+    main()
+# end if
@@ -0,0 +1,250 @@
+# memory.py
+
+from __future__ import annotations
+
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Generator
+
+__all__ = [
+    "REFERENCE_BYTES_PER_PIXEL",
+    "STRIPED_BYTES_PER_PIXEL",
+    "estimate_peak_bytes",
+    "image_size",
+    "read_image_size",
+    "parse_size",
+    "MemoryGovernor"
+]
+
+# uint8 input (3), float32 LAB (12), resized ab (8), split channels (12),
+# concatenated LAB (12), float32 BGR (12), scaled BGR (12), uint8 output (3)
+REFERENCE_BYTES_PER_PIXEL = 74
+
+# uint8 input (3) and output (3), the rest is held one stripe at a time
+STRIPED_BYTES_PER_PIXEL = 6
+
+# float32 LAB, float32 BGR, interpolated ab and its temporaries of a stripe row
+STRIPE_ROW_BYTES_PER_PIXEL = 48
+
+# the network input and the ab map, widened to the image width (56 rows)
+NETWORK_BYTES = 224 * 224 * 4 * 8
+
+UNITS = {
+    "": 1,
+    "k": 1024,
+    "m": 1024 ** 2,
+    "g": 1024 ** 3,
+    "t": 1024 ** 4
+}
+
+def estimate_peak_bytes(
+        height: int,
+        width: int,
+        low_memory: bool = False,
+        rows: int = 256
+) -> int:
+    """
+    Estimates the peak memory of colorizing an image.
+
+    :param height: The height of the image.
+    :param width: The width of the image.
+    :param low_memory: The value to estimate the striped processing.
+    :param rows: The amount of rows in each stripe.
+
+    :returns: The estimated amount of bytes.
+    """
+
+    pixels = height * width
+
+    if not low_memory:
+        return pixels * REFERENCE_BYTES_PER_PIXEL + NETWORK_BYTES
+
+    return (
+        pixels * STRIPED_BYTES_PER_PIXEL +
+        min(rows, height) * width * STRIPE_ROW_BYTES_PER_PIXEL +
+        56 * width * 8 + NETWORK_BYTES
+    )
+
+def image_size(data: bytes) -> tuple[int, int] | None:
+    """
+    Reads the size of an encoded image from its header, without decoding it.
+
+    PNG, JPEG and BMP headers are supported.
+
+    :param data: The beginning of the encoded image.
+
+    :returns: The (height, width) of the image, or None for an unknown format.
+    """
+
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+
+        return height, width
+
+    if data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+
+        return abs(height), width
+
+    if data[:2] != b"\xff\xd8":
+        return None
+
+    position = 2
+
+    while position + 9 <= len(data):
+        if data[position] != 0xFF:
+            position += 1
+
+            continue
+
+        marker = data[position + 1]
+
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            position += 1 if marker == 0xFF else 2
+
+            continue
+
+        length = struct.unpack(">H", data[position + 2:position + 4])[0]
+
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[position + 5:position + 9])
+
+            return height, width
+
+        position += 2 + length
+
+    return None
+
+def read_image_size(path: str, limit: int = 1 << 16) -> tuple[int, int] | None:
+    """
+    Reads the size of an image file from its header, without decoding it.
+
+    :param path: The path to the image file.
+    :param limit: The maximum amount of bytes to read.
+
+    :returns: The (height, width) of the image, or None for an unknown format.
+    """
+
+    with open(path, "rb") as file:
+        return image_size(file.read(limit))
+
+def parse_size(size: str | int) -> int:
+    """
+    Parses an amount of bytes, like 512M or 2G.
+
+    :param size: The amount of bytes, with an optional binary unit.
+
+    :returns: The amount of bytes.
+    """
+
+    if isinstance(size, int):
+        return size
+
+    text = size.strip().lower().removesuffix("ib").removesuffix("b")
+    unit = text[-1:] if text[-1:] in UNITS else ""
+
+    return int(float(text[:len(text) - len(unit)]) * UNITS[unit])
+
+class MemoryGovernor:
+    """
+    A class to represent a memory budget shared by colorization jobs.
+
+    Jobs reserve their estimated peak memory before loading their image,
+    and wait while the budget is used by other jobs, which holds back the
+    readers of the jobs. A job larger than the whole budget runs alone.
+    Images whose reference estimate is above the threshold fraction of
+    the budget are colorized in the low memory striped mode.
+
+    >>> from image_colorizer.memory import MemoryGovernor
+    >>>
+    >>> governor = MemoryGovernor("2G")
+    >>>
+    >>> with governor.reserve(*governor.plan(4000, 6000)):
+    >>>     ...
+    """
+
+    THRESHOLD = 0.5
+
+    def __init__(self, budget: int | str, threshold: float = None) -> None:
+        """
+        Defines the memory budget.
+
+        :param budget: The amount of bytes, with an optional binary unit.
+        :param threshold: The fraction of the budget above which jobs use less memory.
+        """
+
+        self.budget = parse_size(budget)
+        self.threshold = self.THRESHOLD if threshold is None else threshold
+        self.used = 0
+
+        self._condition = threading.Condition()
+
+    def plan(self, height: int, width: int) -> tuple[int, bool]:
+        """
+        Estimates the memory of a job, and selects its processing mode.
+
+        :param height: The height of the image.
+        :param width: The width of the image.
+
+        :returns: The estimated amount of bytes and the value of the low memory mode.
+        """
+
+        estimate = estimate_peak_bytes(height, width)
+
+        if estimate <= self.budget * self.threshold:
+            return estimate, False
+
+        return estimate_peak_bytes(height, width, low_memory=True), True
+
+    def acquire(self, size: int, timeout: float = None) -> bool:
+        """
+        Waits until the amount of bytes fits in the budget, and reserves it.
+
+        :param size: The amount of bytes to reserve.
+        :param timeout: The maximum amount of seconds to wait.
+
+        :returns: The value of the bytes being reserved.
+        """
+
+        with self._condition:
+            admitted = self._condition.wait_for(
+                lambda: self.used == 0 or self.used + size <= self.budget,
+                timeout=timeout
+            )
+
+            if admitted:
+                self.used += size
+
+            return admitted
+
+    def release(self, size: int) -> None:
+        """
+        Returns reserved bytes to the budget.
+
+        :param size: The amount of bytes to release.
+        """
+
+        with self._condition:
+            self.used = max(0, self.used - size)
+
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, size: int, low_memory: bool = False) -> Generator[bool, None, None]:
+        """
+        Reserves the amount of bytes while the context runs.
+
+        :param size: The amount of bytes to reserve.
+        :param low_memory: The value of the low memory mode, passed through.
+
+        :returns: The value of the low memory mode.
+        """
+
+        self.acquire(size)
+
+        try:
+            yield low_memory
+
+        finally:
+            self.release(size)
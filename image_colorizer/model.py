@@ -1,22 +1,41 @@
 # model.py
 
+from __future__ import annotations
+
 import datetime as dt
 import shutil
 import os
+import threading
+import time
 from dataclasses import dataclass
+from typing import Callable, Generator
 
 import cv2
 import numpy as np
 
 from image_colorizer.base import models
+from image_colorizer.chroma import ChromaLayer, image_hash, save_chroma
 
 __all__ = [
     "ModelsLocations",
     "build_model",
     "load_model",
+    "preload",
+    "warmup",
+    "is_colored",
+    "FORCE",
+    "SKIP",
+    "PASSTHROUGH",
+    "POLICIES",
     "Colorizer"
 ]
 
+FORCE = "force"
+SKIP = "skip"
+PASSTHROUGH = "passthrough"
+
+POLICIES = (FORCE, SKIP, PASSTHROUGH)
+
 def split(data: bytes, fractions: int) -> list[bytes]:
     """
     Splits the data into different parts.
@@ -43,6 +62,87 @@ def split(data: bytes, fractions: int) -> list[bytes]:
     return payload
 # end split
 
+def is_colored(
+        image: np.array,
+        tolerance: float = 6.0,
+        tint: float = 12.0,
+        sepia: float = 45.0,
+        size: int = 128
+) -> bool:
+    """
+    Checks if the image is already colored, on a sparse sample of its pixels.
+
+    The chroma of the sample is measured in LAB, and fitted as a tone
+    that follows the lightness. A grayscale image has no chroma, and a
+    toned scan has a single tint that only scales with the lightness,
+    so neither leaves a chroma spread around the tone. The tone itself
+    must also be a faint tint of any hue, or a warm sepia tone, since
+    a few flat colors of different lightness also fit a tone exactly.
+
+    :param image: The BGR image object.
+    :param tolerance: The maximum chroma spread of a grayscale image.
+    :param tint: The maximum chroma of a tint of any hue.
+    :param sepia: The maximum chroma of a warm sepia tone.
+    :param size: The maximum side length of the sample.
+
+    :returns: The value of the image being colored.
+    """
+
+    if image.ndim < 3 or image.shape[2] < 3:
+        return False
+
+    step = max(1, max(image.shape[:2]) // size)
+    sample = np.ascontiguousarray(image[::step, ::step, :3], dtype=np.float32) / 255
+
+    lab = cv2.cvtColor(sample, cv2.COLOR_BGR2LAB).reshape(-1, 3).astype(np.float64)
+
+    lightness = np.stack([np.ones(len(lab)), lab[:, 0]], axis=1)
+    tone = lightness @ np.linalg.lstsq(lightness, lab[:, 1:], rcond=None)[0]
+
+    spread = np.sqrt(np.mean(np.sum((lab[:, 1:] - tone) ** 2, axis=1)))
+
+    if spread > tolerance:
+        return True
+
+    chroma = np.hypot(tone[:, 0], tone[:, 1])
+    hue = np.degrees(np.arctan2(tone[:, 1], tone[:, 0]))
+
+    toned = (chroma <= tint) | ((chroma <= sepia) & (hue >= 50) & (hue <= 105))
+
+    return not bool(toned.all())
+
+def linear_coefficients(
+        source: int, target: int
+) -> tuple[np.array, np.array, np.array, np.array]:
+    """
+    Computes the bilinear resize coefficients of one axis, as OpenCV does.
+
+    A resized position is read from the source positions at the first
+    and the second indexes, weighted by the first and the second weights.
+
+    :param source: The length of the source axis.
+    :param target: The length of the resized axis.
+
+    :returns: The first and second indexes and weights.
+    """
+
+    positions = (
+        (np.arange(target, dtype=np.float64) + 0.5) * (source / target) - 0.5
+    ).astype(np.float32)
+
+    first = np.floor(positions).astype(np.int64)
+    weights = positions - first.astype(np.float32)
+
+    weights[first < 0] = 0
+    first[first < 0] = 0
+
+    weights[first >= source - 1] = 0
+    first[first >= source - 1] = source - 1
+
+    second = np.minimum(first + 1, source - 1)
+
+    return first, second, np.float32(1) - weights, weights
+
 @dataclass(slots=True)
 class ModelsLocations:
     """A class to represent a model locator."""
@@ -142,6 +242,11 @@ class Colorizer:
     - image:
         A path to an image file, or a numpy array of the image to colorize.
 
+    - policy:
+        What to do with an image that is already colored: colorize it anyway
+        (force), leave the colorized image empty (skip), or use the image
+        as is (passthrough).
+
     >>> from image_colorizer import Colorizer
     >>>
     >>> colorizer = Colorizer("<PATH TO B&W IMAGE>")
@@ -149,50 +254,330 @@ class Colorizer:
     """
 
     model = None
+    lock = threading.RLock()
 
     DELAY = 0
+    POLICY = FORCE
+    INPUT_SIZE = 224
+    PREVIEW_SIZE = 256
+    STRIPE_ROWS = 256
 
-    __slots__ = "image", "colorized_image", "bw_image", "delay"
+    __slots__ = "image", "colorized_image", "bw_image", "ab_image", "delay", "policy"
 
-    def __init__(self, image: np.array | str) -> None:
+    def __init__(self, image: np.array | str, policy: str = None) -> None:
         """
         Processes the image input as a file path or an image array
 
         :param image: The path to the image file or the image object
+        :param policy: The policy for images that are already colored.
         """
 
-        if Colorizer.model is None:
-            Colorizer.model = create_model()
+        if policy is None:
+            policy = self.POLICY
+
+        if policy not in POLICIES:
+            raise ValueError(
+                f"Invalid policy: {policy}. Valid policies are: {', '.join(POLICIES)}."
+            )
+
+        self.policy = policy
+
+        preload()
 
         self.colorized_image = None
+        self.ab_image = None
 
         self.bw_image = self.configure_image(image)
 
         self.delay = self.DELAY
 
-    def colorize_image(self) -> np.array:
+    @staticmethod
+    def lab_image(image: np.array) -> np.array:
         """
-        Colorizes the image using the image colorization.
+        Converts the image into the normalized LAB color space.
 
-        :returns: The colorized image object.
+        :param image: The BGR image object.
+
+        :returns: The LAB image array.
+        """
+
+        normalized_img = image.astype("float32") / 255.0
+
+        return cv2.cvtColor(normalized_img, cv2.COLOR_BGR2LAB)
+
+    @classmethod
+    def light_input(cls, image: np.array) -> np.array:
+        """
+        Computes the light channel of the network input.
+
+        The LAB light channel is resized bilinearly to the input size,
+        but only the few pixels that the interpolation reads are converted,
+        so the input does not need the full resolution LAB image.
+
+        :param image: The BGR image object.
+
+        :returns: The light channel array of the input size.
+        """
+
+        height, width = image.shape[:2]
+
+        top, bottom, first, second = linear_coefficients(height, cls.INPUT_SIZE)
+        left, right, before, after = linear_coefficients(width, cls.INPUT_SIZE)
+
+        rows_needed = np.union1d(top, bottom)
+        columns_needed = np.union1d(left, right)
+
+        sample_img = image[rows_needed][:, columns_needed]
+        light_img = cls.lab_image(sample_img)[:, :, 0]
+
+        light_img = (
+            light_img[:, np.searchsorted(columns_needed, left)] * before +
+            light_img[:, np.searchsorted(columns_needed, right)] * after
+        )
+
+        return (
+            light_img[np.searchsorted(rows_needed, top)] * first[:, np.newaxis] +
+            light_img[np.searchsorted(rows_needed, bottom)] * second[:, np.newaxis]
+        )
+
+    def predict_ab(self) -> np.array:
+        """
+        Runs the network on the light channel of the image.
+
+        :returns: The low resolution ab channels predicted by the network.
+        """
+
+        return self.predict_abs([self.bw_image])[0]
+
+    @classmethod
+    def predict_abs(cls, images: list[np.array]) -> np.array:
+        """
+        Runs the network on the light channels of the images, in one batch.
+
+        :param images: The BGR image objects.
+
+        :returns: The low resolution ab channels predicted by the network, for each image.
         """
 
-        normalized_img = self.bw_image.astype("float32") / 255.0
-        lab_img = cv2.cvtColor(normalized_img, cv2.COLOR_BGR2LAB)
-        resized_img = cv2.resize(lab_img, (224, 224))
-        light_img = cv2.split(resized_img)[0] - 50
+        light_images = [cls.light_input(image) - 50 for image in images]
 
-        self.model.setInput(cv2.dnn.blobFromImage(light_img))
+        blob = cv2.dnn.blobFromImages(light_images)
 
-        ab = self.model.forward()[0, :, :, :].transpose((1, 2, 0))
-        ab = cv2.resize(ab, (self.bw_image.shape[1], self.bw_image.shape[0]))
+        with cls.lock:
+            cls.model.setInput(blob)
+
+            ab = cls.model.forward()
+
+        return ab.transpose((0, 2, 3, 1))
+
+    @staticmethod
+    def combine(lab_img: np.array, ab: np.array) -> np.array:
+        """
+        Combines the light channel of the LAB image with the ab channels.
+
+        :param lab_img: The LAB image array.
+        :param ab: The ab channels predicted by the network.
+
+        :returns: The colorized image object.
+        """
+
+        ab = cv2.resize(ab, (lab_img.shape[1], lab_img.shape[0]))
 
         light_img = cv2.split(lab_img)[0]
 
         colorized_img = np.concatenate((light_img[:, :, np.newaxis], ab), axis=2)
         colorized_img = cv2.cvtColor(colorized_img, cv2.COLOR_LAB2BGR)
 
-        self.colorized_image = (255 * colorized_img).astype("uint8")
+        return (255 * colorized_img).astype("uint8")
+
+    def bypass(self) -> bool:
+        """
+        Applies the policy to an image that is already colored.
+
+        :returns: The value of the image bypassing the network.
+        """
+
+        if self.policy == FORCE or not is_colored(self.bw_image):
+            return False
+
+        self.colorized_image = (
+            self.bw_image if self.policy == PASSTHROUGH else None
+        )
+
+        return True
+
+    def colorize_image(self) -> np.array:
+        """
+        Colorizes the image using the image colorization.
+
+        :returns: The colorized image object, or None for a skipped image.
+        """
+
+        if self.bypass():
+            return self.colorized_image
+
+        self.ab_image = self.predict_ab()
+        self.colorized_image = self.combine(self.lab_image(self.bw_image), self.ab_image)
+
+        return self.colorized_image
+
+    def colorize_striped(self, rows: int = None) -> np.array:
+        """
+        Colorizes the image in horizontal stripes, to use less memory.
+
+        The network input is the same as in colorize_image, and the full
+        resolution LAB conversions run one stripe at a time, so only the
+        input and the output images are held at full resolution.
+
+        :param rows: The amount of rows in each stripe.
+
+        :returns: The colorized image object, or None for a skipped image.
+        """
+
+        if self.bypass():
+            return self.colorized_image
+
+        if rows is None:
+            rows = self.STRIPE_ROWS
+
+        height, width = self.bw_image.shape[:2]
+
+        self.ab_image = self.predict_ab()
+
+        ab_height = self.ab_image.shape[0]
+        ab_img = cv2.resize(self.ab_image, (width, ab_height))
+
+        top, bottom, first, second = linear_coefficients(ab_height, height)
+        first = first[:, np.newaxis, np.newaxis]
+        second = second[:, np.newaxis, np.newaxis]
+
+        colorized_img = np.empty((height, width, 3), dtype=np.uint8)
+
+        for start in range(0, height, rows):
+            stop = min(start + rows, height)
+
+            lab_img = self.lab_image(self.bw_image[start:stop])
+            lab_img[:, :, 1:] = (
+                ab_img[top[start:stop]] * first[start:stop] +
+                ab_img[bottom[start:stop]] * second[start:stop]
+            )
+
+            colorized_img[start:stop] = 255 * cv2.cvtColor(lab_img, cv2.COLOR_LAB2BGR)
+
+        self.colorized_image = colorized_img
+
+        return self.colorized_image
+
+    @classmethod
+    def colorize_images(
+            cls, images: list[np.array], policy: str = None
+    ) -> list[np.array | None]:
+        """
+        Colorizes the images with a single batched forward pass.
+
+        :param images: The BGR image objects.
+        :param policy: The policy for images that are already colored.
+
+        :returns: The colorized image objects, with None for skipped images.
+        """
+
+        if policy is None:
+            policy = cls.POLICY
+
+        preload()
+
+        results = list(images)
+        indexes = [
+            i for i, image in enumerate(images)
+            if policy == FORCE or not is_colored(image)
+        ]
+
+        if policy == SKIP:
+            results = [None] * len(images)
+
+        if not indexes:
+            return results
+
+        predicted = cls.predict_abs([images[i] for i in indexes])
+
+        for i, ab in zip(indexes, predicted):
+            results[i] = cls.combine(cls.lab_image(images[i]), ab)
+
+        return results
+
+    def preview_image(self, size: int = None) -> np.array:
+        """
+        Colorizes a downscaled copy of the image.
+
+        The network input is the same as in colorize_image, and it only
+        reads a few pixels, so the predicted ab channels are kept and reused
+        for the full resolution image, while the preview only converts
+        the downscaled image.
+
+        :param size: The maximum side length of the preview.
+
+        :returns: The colorized preview image object.
+        """
+
+        if size is None:
+            size = self.PREVIEW_SIZE
+
+        self.ab_image = self.predict_ab()
+
+        height, width = self.bw_image.shape[:2]
+        scale = min(1.0, size / max(height, width))
+
+        small_img = cv2.resize(
+            self.bw_image,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA
+        )
+
+        return self.combine(self.lab_image(small_img), self.ab_image)
+
+    def progressive_images(self, size: int = None) -> Generator[np.array, None, None]:
+        """
+        Yields a fast colorized preview, and then the full resolution image.
+
+        The full resolution image is identical to the result of colorize_image.
+        An image that is already colored is yielded once as is
+        by the passthrough policy, and not at all by the skip policy.
+
+        :param size: The maximum side length of the preview.
+
+        :returns: The generator of the preview and the colorized image.
+        """
+
+        if self.bypass():
+            if self.colorized_image is not None:
+                yield self.colorized_image
+
+            return
+
+        yield self.preview_image(size)
+
+        self.colorized_image = self.combine(
+            self.lab_image(self.bw_image), self.ab_image
+        )
+
+        yield self.colorized_image
+
+    def colorize_progressive(
+            self,
+            callback: Callable[[np.array], None],
+            size: int = None
+    ) -> np.array:
+        """
+        Colorizes the image, calling the callback with the preview and the result.
+
+        :param callback: The function to call with each image.
+        :param size: The maximum side length of the preview.
+
+        :returns: The colorized image object.
+        """
+
+        for image in self.progressive_images(size):
+            callback(image)
 
         return self.colorized_image
 
@@ -236,6 +621,36 @@ class Colorizer:
 
         return self.colorized_image
 
+    def configure_ab_image(self) -> np.array:
+        """
+        Configures the predicted ab channels existing state.
+
+        :returns: The low resolution ab channels array.
+        """
+
+        if self.ab_image is None:
+            self.ab_image = self.predict_ab()
+
+        return self.ab_image
+
+    def chroma_layer(self, interpolation: str = "linear") -> ChromaLayer:
+        """
+        Creates the chroma layer of the predicted ab channels.
+
+        :param interpolation: The interpolation to render the layer with.
+
+        :returns: The chroma layer object.
+        """
+
+        return ChromaLayer(
+            ab=self.configure_ab_image(),
+            source=image_hash(self.bw_image),
+            interpolation=interpolation,
+            metadata=dict(
+                width=self.bw_image.shape[1], height=self.bw_image.shape[0]
+            )
+        )
+
     def display_image(
             self,
             image: np.array,
@@ -288,12 +703,42 @@ class Colorizer:
         :param title: The title of the image window.
         """
 
-        self.configure_colorized_image()
+        if self.configure_colorized_image() is None:
+            return
+
         self.display_image(
             image=self.colorized_image,
             delay=delay or self.delay, title=title
         )
 
+    def display_progressive_image(
+            self,
+            delay: int | float | dt.timedelta = None,
+            title: str = "colorized image",
+            size: int = None
+    ) -> None:
+        """
+        Displays a fast preview, and then replaces it with the full colorized image.
+
+        :param delay: The amount of seconds to show the window.
+        :param title: The title of the image window.
+        :param size: The maximum side length of the preview.
+        """
+
+        image = None
+
+        for image in self.progressive_images(size):
+            cv2.imshow(title or "", image)
+            cv2.waitKey(1)
+
+        if image is None:
+            return
+
+        self.display_image(
+            image=image,
+            delay=delay or self.delay, title=title
+        )
+
     def save_original_image(self, path: str) -> None:
         """
         Saves the given image object into a file by the file path
@@ -310,6 +755,57 @@ class Colorizer:
         :param path: The file path to save the image in.
         """
 
-        self.configure_colorized_image()
+        if self.configure_colorized_image() is None:
+            return
 
         self.save_image(image=self.colorized_image, path=path)
+
+    def save_chroma_layer(self, path: str, interpolation: str = "linear") -> None:
+        """
+        Saves the chroma layer of the image into a file by the file path
+
+        :param path: The file path to save the layer in.
+        :param interpolation: The interpolation to render the layer with.
+        """
+
+        save_chroma(self.chroma_layer(interpolation), path=path)
+
+def preload() -> cv2.dnn.readNetFromCaffe:
+    """
+    Loads the shared network model, if it is not loaded yet.
+
+    The network is shared by all threads, so it is loaded once,
+    and each forward pass holds the lock of the colorizer class.
+
+    :returns: The network model.
+    """
+
+    with Colorizer.lock:
+        if Colorizer.model is None:
+            Colorizer.model = create_model()
+
+    return Colorizer.model
+
+def warmup(runs: int = 1) -> float:
+    """
+    Runs dummy forward passes to prime the network and the OpenCV allocators.
+
+    :param runs: The amount of forward passes to run.
+
+    :returns: The amount of seconds the forward passes took.
+    """
+
+    net = preload()
+
+    blob = np.zeros(
+        (1, 1, Colorizer.INPUT_SIZE, Colorizer.INPUT_SIZE), dtype=np.float32
+    )
+
+    start = time.perf_counter()
+
+    for _ in range(runs):
+        with Colorizer.lock:
+            net.setInput(blob)
+            net.forward()
+
+    return time.perf_counter() - start
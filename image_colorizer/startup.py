@@ -0,0 +1,80 @@
+# startup.py
+
+import importlib
+import time
+from dataclasses import dataclass
+
+__all__ = [
+    "StartupReport",
+    "measure_startup"
+]
+
+@dataclass(slots=True)
+class StartupReport:
+    """A class to represent the cold start timings, in seconds."""
+
+    imports: float
+    load: float
+    build: float
+    warmup: float
+
+    @property
+    def total(self) -> float:
+        """
+        Returns the total cold start time.
+
+        :returns: The amount of seconds.
+        """
+
+        return self.imports + self.load + self.build + self.warmup
+
+    def __str__(self) -> str:
+        """
+        Returns the report as text.
+
+        :returns: The text of the report.
+        """
+
+        return "\n".join(
+            f"{name:<8} {seconds * 1000:10.1f} ms"
+            for name, seconds in (
+                ("imports", self.imports),
+                ("load", self.load),
+                ("build", self.build),
+                ("warmup", self.warmup),
+                ("total", self.total)
+            )
+        )
+
+def measure_startup(runs: int = 1) -> StartupReport:
+    """
+    Measures the cold start of the colorizer, and keeps the loaded model.
+
+    The import time is only meaningful in a fresh process,
+    before anything imported the model module. A network that is
+    already loaded is kept, and its load and build times are reported as 0.
+
+    :param runs: The amount of warmup forward passes to run.
+
+    :returns: The startup report object.
+    """
+
+    start = time.perf_counter()
+    model = importlib.import_module("image_colorizer.model")
+    imports = time.perf_counter() - start
+
+    load = build = 0.0
+
+    with model.Colorizer.lock:
+        if model.Colorizer.model is None:
+            start = time.perf_counter()
+            locator = model.load_model()
+            load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            model.Colorizer.model = model.build_model(locator)
+            build = time.perf_counter() - start
+
+    warmup = model.warmup(runs) if runs else 0.0
+
+    return StartupReport(imports=imports, load=load, build=build, warmup=warmup)
@@ -0,0 +1,512 @@
+# stream.py
+
+from __future__ import annotations
+
+import queue
+import struct
+import threading
+from typing import BinaryIO, Callable, Generator, Iterable
+
+import cv2
+import numpy as np
+
+from image_colorizer.memory import MemoryGovernor, image_size
+from image_colorizer.model import PASSTHROUGH, SKIP, Colorizer
+
+__all__ = [
+    "PIXEL_FORMATS",
+    "read_raw_frames",
+    "read_encoded_data",
+    "read_encoded_frames",
+    "decode_frame",
+    "write_raw_frame",
+    "write_encoded_frame",
+    "colorize_stream",
+    "pipe"
+]
+
+PIXEL_FORMATS = {
+    "gray": 1,
+    "bgr24": 3
+}
+
+LENGTH = struct.Struct(">I")
+
+_END = object()
+
+def read_exactly(stream: BinaryIO, size: int) -> bytes:
+    """
+    Reads exactly the amount of bytes from the stream, unless it ends first.
+
+    :param stream: The binary stream to read from.
+    :param size: The amount of bytes to read.
+
+    :returns: The data, shorter than the size only at the end of the stream.
+    """
+
+    chunks = []
+
+    while size > 0:
+        chunk = stream.read(size)
+
+        if not chunk:
+            break
+
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return b"".join(chunks)
+
+def read_raw_frames(
+        stream: BinaryIO,
+        width: int,
+        height: int,
+        pixel_format: str = "gray"
+) -> Generator[np.array, None, None]:
+    """
+    Reads fixed size raw frames from the stream.
+
+    :param stream: The binary stream to read from.
+    :param width: The width of the frames.
+    :param height: The height of the frames.
+    :param pixel_format: The pixel format of the frames.
+
+    :returns: The generator of BGR frames.
+    """
+
+    channels = PIXEL_FORMATS[pixel_format]
+    size = width * height * channels
+
+    while data := read_exactly(stream, size):
+        if len(data) < size:
+            raise ValueError(
+                f"Incomplete frame at the end of the stream: "
+                f"{len(data)} of {size} bytes."
+            )
+
+        frame = np.frombuffer(data, dtype=np.uint8).reshape(height, width, channels)
+
+        if channels == 1:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+        yield frame
+
+def read_encoded_data(stream: BinaryIO) -> Generator[bytes, None, None]:
+    """
+    Reads length prefixed encoded images from the stream, without decoding them.
+
+    Each image is preceded by its size as a 4 bytes big endian integer.
+
+    :param stream: The binary stream to read from.
+
+    :returns: The generator of encoded images.
+    """
+
+    while header := read_exactly(stream, LENGTH.size):
+        if len(header) < LENGTH.size:
+            raise ValueError("Incomplete length prefix at the end of the stream.")
+
+        size = LENGTH.unpack(header)[0]
+        data = read_exactly(stream, size)
+
+        if len(data) < size:
+            raise ValueError(
+                f"Incomplete image at the end of the stream: "
+                f"{len(data)} of {size} bytes."
+            )
+
+        yield data
+
+def decode_frame(data: bytes) -> np.array:
+    """
+    Decodes an encoded image into a BGR frame.
+
+    :param data: The encoded image.
+
+    :returns: The BGR frame.
+    """
+
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    if frame is None:
+        raise ValueError("Unable to decode an image from the stream.")
+
+    return frame
+
+def read_encoded_frames(stream: BinaryIO) -> Generator[np.array, None, None]:
+    """
+    Reads length prefixed encoded images from the stream.
+
+    Each image is preceded by its size as a 4 bytes big endian integer.
+
+    :param stream: The binary stream to read from.
+
+    :returns: The generator of BGR frames.
+    """
+
+    for data in read_encoded_data(stream):
+        yield decode_frame(data)
+
+def write_raw_frame(stream: BinaryIO, image: np.array) -> None:
+    """
+    Writes the image into the stream as a raw BGR frame.
+
+    :param stream: The binary stream to write into.
+    :param image: The image object to write.
+    """
+
+    stream.write(np.ascontiguousarray(image).tobytes())
+
+def write_encoded_frame(
+        stream: BinaryIO,
+        image: np.array,
+        extension: str = ".png"
+) -> None:
+    """
+    Writes the image into the stream as a length prefixed encoded image.
+
+    :param stream: The binary stream to write into.
+    :param image: The image object to write.
+    :param extension: The extension of the encoding format.
+    """
+
+    success, data = cv2.imencode(extension, image)
+
+    if not success:
+        raise ValueError(f"Unable to encode an image as {extension}.")
+
+    stream.write(LENGTH.pack(len(data)))
+    stream.write(data.tobytes())
+
+class FrameReader:
+    """
+    A class to represent a thread that reads frames ahead into a bounded buffer.
+
+    With a memory governor, each frame waits for its estimated memory to
+    fit in the budget before it is decoded, and before the next frame is
+    read. Encoded frames are planned from their header when its format
+    is known. The reader holds the reservations of the frames until they
+    are released, so closing the reader releases the frames that were
+    never consumed, and stops the thread.
+    """
+
+    def __init__(
+            self,
+            frames: Iterable[np.array | bytes],
+            buffer: int = 8,
+            governor: MemoryGovernor = None,
+            decode: Callable[[bytes], np.array] = None
+    ) -> None:
+        """
+        Defines the reader, and starts its thread.
+
+        :param frames: The frames to read, or the encoded frames with a decoder.
+        :param buffer: The maximum amount of frames read ahead.
+        :param governor: The memory budget of the frames.
+        :param decode: The function to decode an encoded frame.
+        """
+
+        self.governor = governor
+        self.decode = decode
+        self.error = None
+
+        self._frames = frames
+        self._buffer = queue.Queue(maxsize=buffer)
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._read_all, daemon=True)
+        self._thread.start()
+
+    def _plan(self, item: np.array | bytes) -> tuple[np.array | None, int, bool]:
+        """
+        Estimates the memory of a frame, from its header when it is encoded.
+
+        :param item: The frame, or the encoded frame.
+
+        :returns: The frame when it is decoded, its memory and its low memory mode.
+        """
+
+        frame = item if self.decode is None else None
+        shape = frame.shape[:2] if frame is not None else image_size(item)
+
+        if shape is None:
+            frame = self.decode(item)
+            shape = frame.shape[:2]
+
+        return (frame, *self.governor.plan(*shape))
+
+    def _reserve(self, size: int) -> bool:
+        """
+        Waits until the memory of a frame fits in the budget, and reserves it.
+
+        :param size: The amount of bytes to reserve.
+
+        :returns: The value of the reader still being open.
+        """
+
+        self.governor.acquire(size)
+
+        with self._lock:
+            if self._closed:
+                self.governor.release(size)
+
+                return False
+
+            self._reserved += size
+
+        return True
+
+    def _put(self, item: object) -> bool:
+        """
+        Puts an item in the buffer, waiting while it is full and the reader is open.
+
+        :param item: The item to put.
+
+        :returns: The value of the item being put.
+        """
+
+        while not self._closed:
+            try:
+                self._buffer.put(item, timeout=0.1)
+
+            except queue.Full:
+                continue
+
+            return True
+
+        return False
+
+    def _read_all(self) -> None:
+        """Moves the frames into the buffer, until the frames end or the reader closes."""
+
+        try:
+            for item in self._frames:
+                frame, size, low_memory = None, 0, False
+
+                if self.governor is not None:
+                    frame, size, low_memory = self._plan(item)
+
+                    if not self._reserve(size):
+                        return
+
+                try:
+                    if frame is None:
+                        frame = item if self.decode is None else self.decode(item)
+
+                except Exception:
+                    self.release(size)
+
+                    raise
+
+                if not self._put((frame, size, low_memory)):
+                    self.release(size)
+
+                    return
+
+        except Exception as error:
+            self.error = error
+
+        finally:
+            self._put(_END)
+
+    def get(self) -> tuple[np.array, int, bool] | object:
+        """
+        Takes the next frame from the buffer, waiting for the reader.
+
+        :returns: The frame, its reserved memory and its low memory mode, or the end marker.
+        """
+
+        return self._buffer.get()
+
+    def empty(self) -> bool:
+        """
+        Checks if no frame is ready in the buffer.
+
+        :returns: The value of the buffer being empty.
+        """
+
+        return self._buffer.empty()
+
+    def release(self, size: int) -> None:
+        """
+        Returns the reserved memory of a consumed frame to the budget.
+
+        :param size: The amount of bytes to release.
+        """
+
+        if self.governor is None:
+            return
+
+        with self._lock:
+            size = min(size, self._reserved)
+
+            self._reserved -= size
+
+        self.governor.release(size)
+
+    def close(self) -> None:
+        """Stops the reader, and releases the memory of the frames that were not released."""
+
+        with self._lock:
+            self._closed = True
+
+            reserved, self._reserved = self._reserved, 0
+
+        if self.governor is not None:
+            self.governor.release(reserved)
+
+def colorize_frames(
+        items: list[tuple[np.array, int, bool]],
+        policy: str = None
+) -> Generator[np.array | None, None, None]:
+    """
+    Colorizes the frames in one batch, except for the low memory frames.
+
+    :param items: The frames, their reserved memory and their low memory mode.
+    :param policy: The policy for frames that are already colored.
+
+    :returns: The generator of colorized frames, with None for skipped frames.
+    """
+
+    batch = [frame for frame, _, low_memory in items if not low_memory]
+    results = iter(Colorizer.colorize_images(batch, policy=policy) if batch else ())
+
+    for frame, _, low_memory in items:
+        if low_memory:
+            yield Colorizer(frame, policy=policy).colorize_striped()
+
+        else:
+            yield next(results)
+
+def colorize_stream(
+        frames: Iterable[np.array | bytes],
+        batch: int = 1,
+        buffer: int = 8,
+        policy: str = None,
+        governor: MemoryGovernor = None,
+        decode: Callable[[bytes], np.array] = None
+) -> Generator[np.array | None, None, None]:
+    """
+    Colorizes the frames in order, reading ahead into a bounded buffer.
+
+    Frames are batched up to the batch size, and a partial batch
+    is colorized whenever the reader has nothing more ready.
+    The memory of a frame is released once the consumer
+    is done with its colorized frame, and the memory of every
+    frame that is left is released when the generator is closed
+    or fails.
+
+    :param frames: The BGR frames to colorize, or the encoded frames with a decoder.
+    :param batch: The maximum amount of frames in one forward pass.
+    :param buffer: The maximum amount of frames read ahead.
+    :param policy: The policy for frames that are already colored.
+    :param governor: The memory budget of the frames.
+    :param decode: The function to decode an encoded frame.
+
+    :returns: The generator of colorized frames, with None for skipped frames.
+    """
+
+    reader = FrameReader(
+        frames, buffer=max(buffer, batch), governor=governor, decode=decode
+    )
+
+    try:
+        items = []
+        done = False
+
+        while not done:
+            item = reader.get()
+
+            if item is _END:
+                done = True
+
+            else:
+                items.append(item)
+
+            if items and (done or len(items) >= batch or reader.empty()):
+                for (_, size, _), image in zip(items, colorize_frames(items, policy)):
+                    yield image
+
+                    reader.release(size)
+
+                items = []
+
+    finally:
+        reader.close()
+
+    if reader.error is not None:
+        raise reader.error
+
+def pipe(
+        source: BinaryIO,
+        target: BinaryIO,
+        width: int = None,
+        height: int = None,
+        pixel_format: str = "gray",
+        extension: str = None,
+        batch: int = 1,
+        buffer: int = 8,
+        policy: str = None,
+        governor: MemoryGovernor = None
+) -> int:
+    """
+    Colorizes a stream of images from the source into the target.
+
+    Raw frames are read when the frame size is given, and written
+    as raw BGR frames, unless an encoding extension is given.
+    Otherwise, length prefixed encoded images are read, and written
+    encoded with the extension, or as PNG images.
+    Frames skipped by the policy are not written into an encoded stream,
+    while a raw stream gets them unchanged, so its frames stay in step
+    with the input frames.
+
+    :param source: The binary stream to read from.
+    :param target: The binary stream to write into.
+    :param width: The width of raw frames.
+    :param height: The height of raw frames.
+    :param pixel_format: The pixel format of raw frames.
+    :param extension: The extension of the output encoding format.
+    :param batch: The maximum amount of frames in one forward pass.
+    :param buffer: The maximum amount of frames read ahead.
+    :param policy: The policy for frames that are already colored.
+    :param governor: The memory budget of the frames.
+
+    :returns: The amount of written frames.
+    """
+
+    raw = width is not None and height is not None
+
+    if raw:
+        frames = read_raw_frames(source, width, height, pixel_format)
+
+    else:
+        frames = read_encoded_data(source)
+        extension = extension or ".png"
+
+    if extension is None and policy == SKIP:
+        policy = PASSTHROUGH
+
+    count = 0
+
+    images = colorize_stream(
+        frames, batch=batch, buffer=buffer, policy=policy, governor=governor,
+        decode=None if raw else decode_frame
+    )
+
+    for image in images:
+        if image is None:
+            continue
+
+        if extension is None:
+            write_raw_frame(target, image)
+
+        else:
+            write_encoded_frame(target, image, extension)
+
+        target.flush()
+
+        count += 1
+
+    return count
@@ -0,0 +1,149 @@
+# test_archive.py
+
+import os
+import tarfile
+import time
+import zipfile
+
+import pytest
+
+from image_colorizer.archive import ShardWriter, entry_name, read_entry, read_index
+
+def encode(image: bytes) -> bytes:
+    """Encodes the test images, which are already bytes."""
+
+    if not image:
+        raise ValueError("empty image")
+
+    return image
+
+@pytest.mark.parametrize("kind", ["tar", "zip"])
+def test_shards_roll_and_index_entries(kind: str, tmp_path) -> None:
+    """Checks that entries are split between shards and found by the index."""
+
+    images = {f"images/{i:03d}.png": bytes([i]) * (100 + 37 * i) for i in range(60)}
+
+    with ShardWriter(
+        str(tmp_path), kind=kind, shard_size=20_000, workers=4, encode=encode
+    ) as writer:
+        for name, image in images.items():
+            writer.write(name, image)
+
+    assert len(writer.shards) > 1
+
+    found = {}
+
+    for shard in writer.shards:
+        index = read_index(shard)
+
+        for name in index:
+            found[name] = read_entry(shard, name, index)
+
+        if kind == "tar":
+            with tarfile.open(shard) as archive:
+                names = archive.getnames()
+
+        else:
+            with zipfile.ZipFile(shard) as archive:
+                names = archive.namelist()
+
+        assert names == list(index)
+
+    assert found == images
+    assert list(found) == list(images)
+
+def test_failed_encoding_fails_only_its_entry(tmp_path) -> None:
+    """Checks that an image that fails to encode does not stop the writer."""
+
+    with ShardWriter(str(tmp_path), encode=encode) as writer:
+        first = writer.write("first.png", b"first")
+        broken = writer.write("broken.png", b"")
+        last = writer.write("last.png", b"last")
+
+    assert first.result() == "first.png"
+    assert isinstance(broken.exception(), ValueError)
+    assert last.result() == "last.png"
+    assert list(read_index(writer.shards[0])) == ["first.png", "last.png"]
+
+    with pytest.raises(ValueError):
+        writer.write("closed.png", b"closed")
+
+@pytest.mark.parametrize("kind", ["tar", "zip"])
+def test_written_entries_are_on_disk(kind: str, tmp_path) -> None:
+    """Checks that an entry can be read once its future is done, before closing."""
+
+    with ShardWriter(str(tmp_path), kind=kind, encode=encode, idle=0) as writer:
+        writer.write("first.png", b"first").result()
+        writer.write("second.png", b"second").result()
+
+        shard = writer.shards[0]
+
+        assert read_entry(shard, "first.png") == b"first"
+        assert read_entry(shard, "second.png") == b"second"
+
+        if kind == "tar":
+            with tarfile.open(shard) as archive:
+                assert archive.getnames() == ["first.png", "second.png"]
+
+@pytest.mark.parametrize("kind", ["tar", "zip"])
+def test_idle_shards_are_finished(kind: str, tmp_path) -> None:
+    """Checks that the current shard is finished when no images are written."""
+
+    with ShardWriter(str(tmp_path), kind=kind, encode=encode, idle=0.05) as writer:
+        writer.write("first.png", b"first").result()
+
+        deadline = time.monotonic() + 5
+
+        while writer._archive is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        if kind == "tar":
+            with tarfile.open(writer.shards[0]) as archive:
+                assert archive.getnames() == ["first.png"]
+
+        else:
+            with zipfile.ZipFile(writer.shards[0]) as archive:
+                assert archive.namelist() == ["first.png"]
+
+        writer.write("second.png", b"second").result()
+
+    assert len(writer.shards) == 2
+    assert list(read_index(writer.shards[1])) == ["second.png"]
+
+def test_existing_shards_are_not_truncated(tmp_path) -> None:
+    """Checks that a writer skips the numbers of existing shards."""
+
+    existing = tmp_path / "shard-00000.tar"
+    existing.write_bytes(b"done")
+    (tmp_path / "shard-00002.tar.index.jsonl").write_text("")
+
+    with ShardWriter(str(tmp_path), encode=encode, shard_size=1000) as writer:
+        writer.write("first.png", b"first" * 100)
+        writer.write("second.png", b"second" * 100)
+
+    with ShardWriter(str(tmp_path), encode=encode) as other:
+        other.write("third.png", b"third")
+
+    assert existing.read_bytes() == b"done"
+    assert not (tmp_path / "shard-00002.tar").exists()
+    assert [os.path.basename(shard) for shard in writer.shards + other.shards] == [
+        "shard-00001.tar", "shard-00003.tar", "shard-00004.tar"
+    ]
+    assert read_entry(other.shards[0], "third.png") == b"third"
+
+def test_entry_names_are_relative(tmp_path) -> None:
+    """Checks that absolute and parent paths are stored as relative names."""
+
+    with ShardWriter(str(tmp_path), kind="zip", encode=encode) as writer:
+        absolute = writer.write(os.path.abspath("out/image.png"), b"image")
+        parent = writer.write_bytes("../out/./other.png", b"other")
+
+    assert absolute.result() == entry_name(os.path.abspath("out/image.png"))
+    assert not absolute.result().startswith("/")
+    assert parent.result() == "out/other.png"
+
+    with zipfile.ZipFile(writer.shards[0]) as archive:
+        assert archive.namelist() == [absolute.result(), "out/other.png"]
+
+    with pytest.raises(ValueError):
+        entry_name("/")
@@ -0,0 +1,55 @@
+# test_chroma.py
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from image_colorizer.chroma import ChromaLayer, image_hash, load_chroma, render, save_chroma
+from image_colorizer.model import Colorizer
+
+def layer_and_image() -> tuple[ChromaLayer, np.ndarray]:
+    """Creates a deterministic image and a chroma layer for it."""
+
+    rng = np.random.default_rng(0)
+
+    image = cv2.cvtColor(
+        rng.integers(0, 256, (97, 131), dtype=np.uint8), cv2.COLOR_GRAY2BGR
+    )
+    ab = rng.uniform(-60, 60, (56, 56, 2)).astype(np.float16).astype(np.float32)
+
+    return ChromaLayer(ab=ab, source=image_hash(image), metadata=dict(note="test")), image
+
+def test_save_and_load_round_trip(tmp_path) -> None:
+    """Checks that a saved chroma layer loads with its data and metadata."""
+
+    layer, _ = layer_and_image()
+    path = str(tmp_path / "layers" / "image.chroma")
+
+    save_chroma(layer, path)
+    loaded = load_chroma(path)
+
+    assert np.array_equal(loaded.ab, layer.ab)
+    assert loaded.ab.dtype == np.float32
+    assert loaded.source == layer.source
+    assert loaded.model == layer.model
+    assert loaded.interpolation == layer.interpolation
+    assert loaded.metadata == layer.metadata
+
+def test_render_matches_the_combination() -> None:
+    """Checks that rendering equals combining the image with the ab channels."""
+
+    layer, image = layer_and_image()
+
+    expected = Colorizer.combine(Colorizer.lab_image(image), layer.ab)
+
+    assert np.array_equal(render(layer, image, verify=True), expected)
+    assert render(layer, image, size=(262, 194)).shape == (194, 262, 3)
+
+def test_render_verifies_the_source() -> None:
+    """Checks that rendering with another image fails the verification."""
+
+    layer, image = layer_and_image()
+
+    with pytest.raises(ValueError):
+        render(layer, 255 - image, verify=True)
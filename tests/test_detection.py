@@ -0,0 +1,81 @@
+# test_detection.py
+
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from image_colorizer.model import is_colored
+
+LION = os.path.join(os.path.dirname(os.path.dirname(__file__)), "lion.jpg")
+
+def gray_image() -> np.ndarray:
+    """Creates a deterministic grayscale BGR image."""
+
+    y, x = np.mgrid[0:1:240j, 0:1:320j]
+    gray = 255 * (0.5 + 0.5 * np.sin(12 * x) * np.cos(9 * y))
+
+    return cv2.cvtColor(gray.astype(np.uint8), cv2.COLOR_GRAY2BGR)
+
+def test_grayscale_images_are_not_colored() -> None:
+    """Checks that grayscale images, also compressed, are not colored."""
+
+    image = gray_image()
+    compressed = cv2.imdecode(
+        cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 40])[1],
+        cv2.IMREAD_COLOR
+    )
+
+    assert not is_colored(image)
+    assert not is_colored(compressed)
+    assert not is_colored(image[:, :, 0])
+
+    if os.path.exists(LION):
+        assert not is_colored(cv2.imread(LION))
+
+def test_toned_images_are_not_colored() -> None:
+    """Checks that sepia toned and tinted grayscale images are not colored."""
+
+    gray = gray_image().astype(np.float32)
+    sepia = (gray * np.array([0.75, 0.9, 1.0], dtype=np.float32)).astype(np.uint8)
+    brown = (gray * np.array([0.55, 0.8, 1.0], dtype=np.float32)).astype(np.uint8)
+    tinted = np.clip(gray + np.array([-8, 0, 10], dtype=np.float32), 0, 255).astype(np.uint8)
+
+    assert not is_colored(sepia)
+    assert not is_colored(brown)
+    assert not is_colored(tinted)
+    assert not is_colored(
+        cv2.imdecode(
+            cv2.imencode(".jpg", sepia, [cv2.IMWRITE_JPEG_QUALITY, 40])[1],
+            cv2.IMREAD_COLOR
+        )
+    )
+
+def test_colored_images_are_colored() -> None:
+    """Checks that images with varied colors are colored."""
+
+    image = gray_image()
+    image[:, :, 2] = 255 - image[:, :, 2]
+
+    assert is_colored(image)
+
+def test_flat_colors_are_colored() -> None:
+    """Checks that a few colors of different lightness are not taken for a tone."""
+
+    disk = np.full((240, 320, 3), 255, dtype=np.uint8)
+    cv2.circle(disk, (160, 120), 40, (0, 0, 220), -1)
+
+    landscape = np.zeros((240, 320, 3), dtype=np.uint8)
+    landscape[:120] = (235, 180, 120)
+    landscape[120:] = (40, 140, 60)
+
+    shading = np.linspace(0.2, 1, 240, dtype=np.float32)[:, np.newaxis, np.newaxis]
+    shaded = np.broadcast_to(
+        shading * np.array([230, 120, 40], dtype=np.float32), (240, 320, 3)
+    ).astype(np.uint8)
+
+    assert is_colored(disk)
+    assert is_colored(landscape)
+    assert is_colored(shaded)
@@ -0,0 +1,262 @@
+# test_equivalence.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from image_colorizer.model import PASSTHROUGH, SKIP, Colorizer, create_model
+from image_colorizer.chroma import load_chroma, render
+
+LION = os.path.join(os.path.dirname(os.path.dirname(__file__)), "lion.jpg")
+
+def synthetic_images() -> dict[str, np.ndarray]:
+    """
+    Creates the deterministic synthetic test images.
+
+    :returns: The images by name.
+    """
+
+    rng = np.random.default_rng(0)
+
+    horizontal = np.tile(np.linspace(0, 255, 320, dtype=np.float32), (240, 1))
+    y, x = np.mgrid[-1:1:301j, -1:1:199j]
+    radial = 255 * np.clip(1 - np.sqrt(x ** 2 + y ** 2), 0, 1)
+    checker = 255 * ((np.indices((256, 256)) // 32).sum(axis=0) % 2)
+    noise = rng.integers(0, 256, (97, 131))
+
+    images = dict(
+        horizontal=horizontal, radial=radial,
+        checker=checker, noise=noise
+    )
+
+    return {
+        name: cv2.cvtColor(image.astype(np.uint8), cv2.COLOR_GRAY2BGR)
+        for name, image in images.items()
+    }
+
+def load_images() -> dict[str, np.ndarray]:
+    """
+    Collects the bundled and the synthetic test images.
+
+    :returns: The images by name.
+    """
+
+    images = synthetic_images()
+
+    if os.path.exists(LION):
+        images["lion"] = cv2.imread(LION)
+
+    return images
+
+IMAGES = load_images()
+
+def reference_colorize(image: np.ndarray) -> np.ndarray:
+    """
+    Colorizes the image with a frozen copy of the original implementation.
+
+    This is the golden baseline of every engine mode, so it must not
+    follow later changes of Colorizer.colorize_image.
+
+    :param image: The BGR image object.
+
+    :returns: The colorized image object.
+    """
+
+    normalized_img = image.astype("float32") / 255.0
+    lab_img = cv2.cvtColor(normalized_img, cv2.COLOR_BGR2LAB)
+    resized_img = cv2.resize(lab_img, (224, 224))
+    light_img = cv2.split(resized_img)[0] - 50
+
+    with Colorizer.lock:
+        Colorizer.model.setInput(cv2.dnn.blobFromImage(light_img))
+
+        ab = Colorizer.model.forward()[0, :, :, :].transpose((1, 2, 0))
+
+    ab = cv2.resize(ab, (image.shape[1], image.shape[0]))
+
+    light_img = cv2.split(lab_img)[0]
+
+    colorized_img = np.concatenate((light_img[:, :, np.newaxis], ab), axis=2)
+    colorized_img = cv2.cvtColor(colorized_img, cv2.COLOR_LAB2BGR)
+
+    return (255 * colorized_img).astype("uint8")
+
+def delta_e(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Computes the CIE76 color difference between two BGR images.
+
+    :param first: The first image.
+    :param second: The second image.
+
+    :returns: The per pixel color difference.
+    """
+
+    first = cv2.cvtColor(first.astype(np.float32) / 255.0, cv2.COLOR_BGR2LAB)
+    second = cv2.cvtColor(second.astype(np.float32) / 255.0, cv2.COLOR_BGR2LAB)
+
+    return np.sqrt(((first - second) ** 2).sum(axis=2))
+
+def colorize(image: np.ndarray, path: str) -> np.ndarray:
+    """Colorizes the image with the current implementation."""
+
+    return Colorizer(image).colorize_image()
+
+def progressive(image: np.ndarray, path: str) -> np.ndarray:
+    """Colorizes the image through the progressive refinement."""
+
+    return list(Colorizer(image).progressive_images())[-1]
+
+def preview(image: np.ndarray, path: str) -> np.ndarray:
+    """Colorizes the low resolution preview."""
+
+    return Colorizer(image).preview_image()
+
+def batch(image: np.ndarray, path: str) -> np.ndarray:
+    """Colorizes the image in a batch with an image of another size."""
+
+    return Colorizer.colorize_images([IMAGES["noise"], image])[1]
+
+def striped(image: np.ndarray, path: str) -> np.ndarray:
+    """Colorizes the image in the low memory striped mode."""
+
+    return Colorizer(image).colorize_striped(rows=37)
+
+def skip(image: np.ndarray, path: str) -> np.ndarray:
+    """Colorizes the image with the policy that skips colored images."""
+
+    return Colorizer(image, policy=SKIP).colorize_image()
+
+def chroma(image: np.ndarray, path: str) -> np.ndarray:
+    """Colorizes the image through a saved and loaded chroma layer."""
+
+    Colorizer(image).save_chroma_layer(path)
+
+    return render(load_chroma(path), image, verify=True)
+
+@dataclass(slots=True)
+class Mode:
+    """A class to represent an engine mode and its error limits."""
+
+    engine: Callable[[np.ndarray, str], np.ndarray]
+    max_error: int
+    mean_error: float
+    mean_delta: float
+    p99_delta: float
+    scaled: bool = False
+
+# The tolerances against the frozen reference are:
+# - colorize: the network input is interpolated in numpy from the few pixels
+#   it reads, and OpenCV rounds a few of its resize sums differently,
+#   rarely moving a pixel by 1. Every mode shares that network input.
+# - preview: the image is downscaled before the conversion to LAB,
+#   and the reference is downscaled after the conversion to BGR.
+# - chroma: the ab channels are stored as float16.
+MODES = {
+    "colorize": Mode(colorize, 1, 0.01, 0.01, 0.1),
+    "progressive": Mode(progressive, 1, 0.01, 0.01, 0.1),
+    "preview": Mode(preview, 48, 1.0, 1.0, 5.0, scaled=True),
+    "chroma": Mode(chroma, 2, 0.05, 0.05, 0.5),
+    "batch": Mode(batch, 1, 0.01, 0.01, 0.1),
+    "skip": Mode(skip, 1, 0.01, 0.01, 0.1),
+    "striped": Mode(striped, 1, 0.01, 0.01, 0.1)
+}
+
+# Modes that only reorder the computations of colorize_image must match it exactly.
+EXACT_MODES = ("progressive", "batch", "skip", "striped")
+
+@pytest.fixture(scope="module", autouse=True)
+def model() -> None:
+    """Loads the network once, or skips when the weights are unavailable."""
+
+    if Colorizer.model is None:
+        try:
+            Colorizer.model = create_model()
+
+        except Exception as error:
+            pytest.skip(f"colorization model unavailable: {error}")
+
+@pytest.fixture(scope="module")
+def references() -> dict[str, np.ndarray]:
+    """Colorizes every test image with the frozen reference implementation."""
+
+    return {name: reference_colorize(image) for name, image in IMAGES.items()}
+
+@pytest.mark.parametrize("mode", EXACT_MODES)
+def test_mode_matches_colorize_image(mode: str, tmp_path) -> None:
+    """Checks that a reordered engine mode is identical to colorize_image."""
+
+    for name, image in IMAGES.items():
+        assert np.array_equal(
+            MODES[mode].engine(image, str(tmp_path / f"{name}.chroma")),
+            Colorizer(image).colorize_image()
+        ), f"{mode}/{name}"
+
+def test_threads_match_a_single_thread() -> None:
+    """Checks that threads sharing the network colorize like a single thread."""
+
+    expected = {
+        name: Colorizer(image).colorize_image() for name, image in IMAGES.items()
+    }
+    names = list(IMAGES) * 4
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = executor.map(
+            lambda name: Colorizer(IMAGES[name]).colorize_image(), names
+        )
+
+        for name, result in zip(names, results):
+            assert np.array_equal(result, expected[name]), name
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("name", IMAGES)
+def test_mode_matches_reference(
+        mode: str,
+        name: str,
+        references: dict[str, np.ndarray],
+        tmp_path
+) -> None:
+    """Compares the output of an engine mode against the reference output."""
+
+    limits = MODES[mode]
+
+    reference = references[name]
+    result = limits.engine(IMAGES[name], str(tmp_path / f"{name}.chroma"))
+
+    if limits.scaled:
+        reference = cv2.resize(
+            reference, (result.shape[1], result.shape[0]),
+            interpolation=cv2.INTER_AREA
+        )
+
+    assert result.shape == reference.shape
+    assert result.dtype == reference.dtype
+
+    error = np.abs(result.astype(np.int16) - reference.astype(np.int16))
+    difference = delta_e(result, reference)
+
+    assert error.max() <= limits.max_error, f"{mode}/{name}: max error {error.max()}"
+    assert error.mean() <= limits.mean_error, (
+        f"{mode}/{name}: mean error {error.mean():.3f}"
+    )
+    assert difference.mean() <= limits.mean_delta, (
+        f"{mode}/{name}: mean delta e {difference.mean():.3f}"
+    )
+    assert np.percentile(difference, 99) <= limits.p99_delta, (
+        f"{mode}/{name}: p99 delta e {np.percentile(difference, 99):.3f}"
+    )
+
+def test_colored_images_bypass_the_network() -> None:
+    """Checks that colored images are skipped and passed through."""
+
+    colored = IMAGES["radial"].copy()
+    colored[:, :, 2] = 255 - colored[:, :, 2]
+
+    assert Colorizer(colored, policy=SKIP).colorize_image() is None
+    assert Colorizer(colored, policy=PASSTHROUGH).colorize_image() is colored
+    assert Colorizer.colorize_images([colored, colored], policy=SKIP) == [None, None]
@@ -0,0 +1,148 @@
+# test_jobs.py
+
+import os
+import threading
+import time
+
+import pytest
+
+from image_colorizer.jobs import (
+    DONE, FAILED, LEASED, PENDING,
+    QueueBackend, Task, Worker, destinations, open_queue
+)
+
+@pytest.fixture(params=["jobs.sqlite", "spool"])
+def location(request, tmp_path) -> str:
+    """Returns the location of an SQLite queue and of a spool queue."""
+
+    return str(tmp_path / request.param)
+
+def test_workers_run_every_task_once(location: str) -> None:
+    """Checks that concurrent workers split the tasks between them."""
+
+    open_queue(location).put_many((f"{i}.png", f"out/{i}.png") for i in range(40))
+
+    runs = []
+    lock = threading.Lock()
+
+    def handler(task: Task) -> None:
+        with lock:
+            runs.append(task.source)
+
+    workers = [
+        Worker(open_queue(location), handler=handler, name=f"worker-{i}", poll=0.01)
+        for i in range(4)
+    ]
+    threads = [threading.Thread(target=worker.run) for worker in workers]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert sorted(runs) == sorted(f"{i}.png" for i in range(40))
+    assert open_queue(location).counts() == {PENDING: 0, LEASED: 0, DONE: 40, FAILED: 0}
+
+def test_failed_tasks_are_retried(location: str) -> None:
+    """Checks that failing tasks are retried up to the maximum attempts."""
+
+    queue = open_queue(location, max_attempts=3, retry_delay=0.01)
+    queue.put("flaky.png", "out/flaky.png")
+    queue.put("broken.png", "out/broken.png")
+
+    attempts = {}
+
+    def handler(task: Task) -> None:
+        attempts[task.source] = attempts.get(task.source, 0) + 1
+
+        if task.source == "broken.png" or attempts[task.source] < 2:
+            raise OSError("unreadable")
+
+    assert Worker(queue, handler=handler, poll=0.01).run() == 1
+    assert attempts == {"flaky.png": 2, "broken.png": 3}
+
+    failed = queue.tasks(FAILED)
+
+    assert [task.source for task in failed] == ["broken.png"]
+    assert failed[0].attempts == 3
+    assert failed[0].error == "OSError: unreadable"
+
+def test_failed_tasks_wait_for_the_retry_delay(location: str) -> None:
+    """Checks that a failed task is not leased again before its retry delay."""
+
+    queue = open_queue(location, retry_delay=0.2)
+    queue.put("flaky.png", "out/flaky.png")
+
+    task = queue.lease("worker", ttl=10)
+
+    assert queue.fail(task, "worker", "OSError: busy")
+    assert queue.lease("worker", ttl=10) is None
+    assert queue.counts()[PENDING] == 1
+
+    time.sleep(0.25)
+
+    task = queue.lease("worker", ttl=10)
+
+    assert task is not None
+    assert task.attempts == 1
+
+def test_expired_leases_are_requeued(location: str) -> None:
+    """Checks that the tasks of dead workers return to the queue."""
+
+    queue = open_queue(location)
+    queue.put("image.png", "out/image.png")
+
+    task = queue.lease("dead", ttl=0.05)
+
+    assert queue.lease("alive", ttl=10) is None
+
+    time.sleep(0.1)
+
+    task = queue.lease("alive", ttl=10)
+
+    assert task is not None
+    assert task.attempts == 1
+    assert not queue.complete(task, "dead")
+    assert queue.complete(task, "alive")
+    assert queue.counts()[DONE] == 1
+
+def test_heartbeats_keep_the_lease(location: str) -> None:
+    """Checks that a worker renewing its lease keeps its task."""
+
+    queue = open_queue(location)
+    queue.put("slow.png", "out/slow.png")
+
+    other = open_queue(location)
+    stolen = []
+
+    def handler(task: Task) -> None:
+        for _ in range(5):
+            time.sleep(0.05)
+
+            if (lease := other.lease("thief", ttl=10)) is not None:
+                stolen.append(lease)
+
+    assert Worker(queue, handler=handler, ttl=0.09).run() == 1
+    assert not stolen
+
+def test_open_queue_backends(tmp_path) -> None:
+    """Checks the selection of the backend by the location."""
+
+    assert type(open_queue(str(tmp_path / "a.db"))).__name__ == "SQLiteQueue"
+    assert type(open_queue(str(tmp_path / "spool"))).__name__ == "SpoolQueue"
+    assert isinstance(open_queue(str(tmp_path / "b.sqlite")), QueueBackend)
+
+def test_destinations_keep_relative_paths(tmp_path) -> None:
+    """Checks that images with the same name do not share a destination."""
+
+    images = [str(tmp_path / "scans" / part / "1.jpg") for part in ("a", "b")]
+
+    assert destinations(images, "out") == [
+        (images[0], os.path.join("out", "a", "1.jpg")),
+        (images[1], os.path.join("out", "b", "1.jpg"))
+    ]
+    assert destinations(images[:1], "out") == [(images[0], os.path.join("out", "1.jpg"))]
+
+    with pytest.raises(ValueError):
+        destinations([images[0], images[0]], "out")
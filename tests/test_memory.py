@@ -0,0 +1,87 @@
+# test_memory.py
+
+import threading
+import time
+
+import pytest
+
+from image_colorizer.memory import (
+    MemoryGovernor, estimate_peak_bytes, image_size, parse_size
+)
+
+def test_parse_size() -> None:
+    """Checks the parsing of amounts of bytes with units."""
+
+    assert parse_size(1000) == 1000
+    assert parse_size("1000") == 1000
+    assert parse_size("512M") == 512 * 1024 ** 2
+    assert parse_size("1.5GiB") == int(1.5 * 1024 ** 3)
+    assert parse_size("64kb") == 64 * 1024
+
+def test_low_memory_estimate_is_smaller() -> None:
+    """Checks that the striped mode is estimated to use less memory."""
+
+    full = estimate_peak_bytes(8000, 6000)
+    striped = estimate_peak_bytes(8000, 6000, low_memory=True)
+
+    assert full > 8000 * 6000 * 70
+    assert striped < full / 5
+
+@pytest.mark.parametrize("extension", [".png", ".jpg", ".bmp"])
+def test_image_size(extension: str) -> None:
+    """Checks reading the size of encoded images from their headers."""
+
+    np = pytest.importorskip("numpy")
+    cv2 = pytest.importorskip("cv2")
+
+    data = cv2.imencode(extension, np.zeros((123, 457, 3), dtype=np.uint8))[1]
+
+    assert image_size(data.tobytes()[:4096]) == (123, 457)
+    assert image_size(b"GIF89a" + bytes(100)) is None
+
+def test_governor_plans_low_memory_for_huge_images() -> None:
+    """Checks the selection of the processing mode by the budget."""
+
+    governor = MemoryGovernor("1G")
+
+    size, low_memory = governor.plan(1000, 1000)
+
+    assert not low_memory
+    assert size == estimate_peak_bytes(1000, 1000)
+
+    size, low_memory = governor.plan(10000, 10000)
+
+    assert low_memory
+    assert size == estimate_peak_bytes(10000, 10000, low_memory=True)
+
+def test_governor_limits_admission() -> None:
+    """Checks that reservations wait for the budget, and oversized jobs run alone."""
+
+    governor = MemoryGovernor(100)
+
+    assert governor.acquire(60)
+    assert not governor.acquire(60, timeout=0.01)
+
+    admitted = threading.Event()
+
+    def reserve() -> None:
+        with governor.reserve(60):
+            admitted.set()
+
+    thread = threading.Thread(target=reserve)
+    thread.start()
+
+    time.sleep(0.05)
+
+    assert not admitted.is_set()
+
+    governor.release(60)
+    thread.join(timeout=1)
+
+    assert admitted.is_set()
+    assert governor.used == 0
+
+    assert governor.acquire(500, timeout=0.01)
+    assert not governor.acquire(1, timeout=0.01)
+
+    governor.release(500)
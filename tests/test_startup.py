@@ -0,0 +1,98 @@
+# test_startup.py
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from image_colorizer.startup import StartupReport, measure_startup
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+
+HEAVY = ("cv2", "numpy")
+
+def imported_modules(code: str) -> set[str]:
+    """
+    Runs the code in a fresh interpreter, and collects the heavy modules it imported.
+
+    :param code: The code to run.
+
+    :returns: The names of the imported heavy modules.
+    """
+
+    script = (
+        f"import sys\n{code}\n"
+        f"print(' '.join(name for name in {HEAVY!r} if name in sys.modules))"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    return set(result.stdout.split())
+
+def test_import_does_not_load_heavy_modules() -> None:
+    """Checks that importing the package does not import OpenCV or numpy."""
+
+    assert imported_modules("import image_colorizer") == set()
+
+def test_help_does_not_load_heavy_modules() -> None:
+    """Checks that the help of the command line does not import OpenCV or numpy."""
+
+    code = (
+        "import contextlib, io, runpy\n"
+        "sys.argv = ['image_colorizer', '--help']\n"
+        "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):\n"
+        "    runpy.run_module('image_colorizer', run_name='__main__')"
+    )
+
+    assert imported_modules(code) == set()
+
+def test_startup_report() -> None:
+    """Checks the total and the text of the startup report."""
+
+    report = StartupReport(imports=0.001, load=0.002, build=0.003, warmup=0.004)
+
+    assert report.total == pytest.approx(0.01)
+
+    lines = str(report).splitlines()
+
+    assert [line.split()[0] for line in lines] == [
+        "imports", "load", "build", "warmup", "total"
+    ]
+    assert lines[-1].split()[1] == "10.0"
+
+def test_measure_startup_keeps_a_loaded_network(monkeypatch) -> None:
+    """Checks that an already loaded network is not replaced."""
+
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("cv2")
+
+    from image_colorizer.model import Colorizer
+
+    class FakeNet:
+        """A network that counts its forward passes."""
+
+        runs = 0
+
+        def setInput(self, blob: np.ndarray) -> None:
+            """Ignores the input blob."""
+
+        def forward(self) -> np.ndarray:
+            """Returns empty ab channels."""
+
+            self.runs += 1
+
+            return np.zeros((1, 2, 56, 56), dtype=np.float32)
+
+    net = FakeNet()
+
+    monkeypatch.setattr(Colorizer, "model", net)
+
+    report = measure_startup(runs=2)
+
+    assert Colorizer.model is net
+    assert net.runs == 2
+    assert report.load == report.build == 0.0
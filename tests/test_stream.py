@@ -0,0 +1,210 @@
+# test_stream.py
+
+import io
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from image_colorizer.memory import MemoryGovernor
+from image_colorizer.model import Colorizer
+from image_colorizer.stream import (
+    LENGTH,
+    colorize_stream,
+    decode_frame,
+    pipe,
+    read_encoded_frames,
+    read_raw_frames,
+    write_encoded_frame
+)
+
+class FakeNet:
+    """A network that predicts ab channels from the light channel of its input."""
+
+    def setInput(self, blob: np.ndarray) -> None:
+        """Stores the input blob."""
+
+        self.blob = blob
+
+    def forward(self) -> np.ndarray:
+        """Predicts ab channels of the network output size."""
+
+        light = np.stack([cv2.resize(image[0], (56, 56)) for image in self.blob])
+
+        return np.stack([light * 0.4, 10 - light * 0.3], axis=1).astype(np.float32)
+
+@pytest.fixture(autouse=True)
+def network(monkeypatch) -> None:
+    """Injects the fake network in place of the colorization model."""
+
+    monkeypatch.setattr(Colorizer, "model", FakeNet())
+
+def gray_frames(count: int, height: int = 30, width: int = 40) -> list[np.ndarray]:
+    """Creates distinct grayscale BGR frames."""
+
+    return [
+        np.full((height, width, 3), 10 * i % 256, dtype=np.uint8)
+        for i in range(count)
+    ]
+
+def colored_frame(height: int = 30, width: int = 40) -> np.ndarray:
+    """Creates a frame that is already colored."""
+
+    rng = np.random.default_rng(0)
+
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+@pytest.mark.parametrize("pixel_format", ["gray", "bgr24"])
+def test_raw_frames_are_framed(pixel_format: str) -> None:
+    """Checks that raw frames are read by their size, and written as BGR frames."""
+
+    frames = gray_frames(3)
+    channels = 1 if pixel_format == "gray" else 3
+    data = b"".join(frame[:, :, :channels].tobytes() for frame in frames)
+
+    read = list(read_raw_frames(io.BytesIO(data), 40, 30, pixel_format))
+
+    assert all(np.array_equal(first, second) for first, second in zip(read, frames))
+    assert len(read) == 3
+
+    target = io.BytesIO()
+
+    assert pipe(io.BytesIO(data), target, 40, 30, pixel_format) == 3
+
+    output = np.frombuffer(target.getvalue(), dtype=np.uint8).reshape(3, 30, 40, 3)
+
+    for image, frame in zip(output, frames):
+        assert np.array_equal(image, Colorizer(frame).colorize_image())
+
+def test_encoded_frames_are_length_prefixed() -> None:
+    """Checks that encoded images round trip through the length prefixed codec."""
+
+    frames = gray_frames(3)
+    stream = io.BytesIO()
+
+    for frame in frames:
+        write_encoded_frame(stream, frame, ".png")
+
+    stream.seek(0)
+
+    assert LENGTH.unpack(stream.getvalue()[:LENGTH.size])[0] == len(
+        cv2.imencode(".png", frames[0])[1]
+    )
+
+    read = list(read_encoded_frames(stream))
+
+    assert all(np.array_equal(first, second) for first, second in zip(read, frames))
+    assert len(read) == 3
+
+    stream.seek(0)
+    target = io.BytesIO()
+
+    assert pipe(stream, target, batch=2) == 3
+
+    target.seek(0)
+
+    for image, frame in zip(read_encoded_frames(target), frames):
+        assert np.array_equal(image, Colorizer(frame).colorize_image())
+
+@pytest.mark.parametrize("batch", [1, 3, 8])
+def test_batches_keep_the_order(batch: int) -> None:
+    """Checks that frames of any batch size and mixed sizes come out in order."""
+
+    frames = gray_frames(5) + gray_frames(2, 50, 20) + gray_frames(4)
+
+    images = list(colorize_stream(iter(frames), batch=batch, buffer=2))
+
+    assert len(images) == len(frames)
+
+    for image, frame in zip(images, frames):
+        assert np.array_equal(image, Colorizer(frame).colorize_image())
+
+def test_truncated_streams_fail() -> None:
+    """Checks that incomplete frames and prefixes at the end of a stream fail."""
+
+    frame = gray_frames(1)[0].tobytes()
+
+    with pytest.raises(ValueError):
+        list(read_raw_frames(io.BytesIO(frame + frame[:100]), 40, 30, "bgr24"))
+
+    stream = io.BytesIO()
+    write_encoded_frame(stream, gray_frames(1)[0], ".png")
+    data = stream.getvalue()
+
+    with pytest.raises(ValueError):
+        list(read_encoded_frames(io.BytesIO(data[:-1])))
+
+    with pytest.raises(ValueError):
+        list(read_encoded_frames(io.BytesIO(data + data[:2])))
+
+    with pytest.raises(ValueError):
+        pipe(io.BytesIO(frame[:100]), io.BytesIO(), 40, 30, "bgr24")
+
+def test_raw_streams_pass_skipped_frames_through() -> None:
+    """Checks that raw streams keep skipped frames, and encoded streams drop them."""
+
+    frames = [gray_frames(1)[0], colored_frame(), gray_frames(2)[1]]
+    data = b"".join(frame.tobytes() for frame in frames)
+
+    target = io.BytesIO()
+
+    assert pipe(io.BytesIO(data), target, 40, 30, "bgr24", policy="skip") == 3
+
+    output = np.frombuffer(target.getvalue(), dtype=np.uint8).reshape(3, 30, 40, 3)
+
+    assert np.array_equal(output[1], frames[1])
+    assert np.array_equal(output[2], Colorizer(frames[2]).colorize_image())
+
+    target = io.BytesIO()
+
+    assert pipe(
+        io.BytesIO(data), target, 40, 30, "bgr24", extension=".png", policy="skip"
+    ) == 2
+
+def test_closing_the_stream_releases_its_memory() -> None:
+    """Checks that frames left in the buffer are released when the consumer stops."""
+
+    governor = MemoryGovernor("64M")
+    frames = iter(gray_frames(100, 300, 400))
+
+    images = colorize_stream(frames, batch=2, buffer=4, governor=governor)
+
+    next(images)
+    time.sleep(0.1)
+
+    assert governor.used > 0
+
+    images.close()
+
+    assert governor.used == 0
+
+def test_failures_release_the_memory_of_the_stream() -> None:
+    """Checks that a colorization error releases the reserved memory."""
+
+    governor = MemoryGovernor("64M")
+    frames = gray_frames(3) + [np.zeros((30, 40), dtype=np.uint8)]
+
+    with pytest.raises(cv2.error):
+        list(colorize_stream(frames, batch=4, governor=governor))
+
+    assert governor.used == 0
+
+def test_encoded_frames_are_reserved_before_decoding() -> None:
+    """Checks that the memory of an encoded frame is planned from its header."""
+
+    governor = MemoryGovernor("64M")
+    data = cv2.imencode(".png", gray_frames(1, 500, 600)[0])[1].tobytes()
+    reserved = []
+
+    def decode(encoded: bytes) -> np.ndarray:
+        reserved.append(governor.used)
+
+        return decode_frame(encoded)
+
+    images = list(colorize_stream([data] * 3, governor=governor, decode=decode))
+
+    assert len(images) == 3
+    assert all(reserved)
+    assert governor.used == 0